@@ -58,9 +58,15 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'mrp.middleware.MatviewRefreshMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if DEBUG:
+    # Flag N+1 query patterns while developing (X-Repeated-Queries header + warning)
+    MIDDLEWARE.append('core.middleware.RepeatedQueryMiddleware')
+    QUERY_REPEAT_LIMIT = 2
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -93,6 +99,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Defaults to the per-process local memory cache; point CACHE_BACKEND at
+# memcached or Redis in production so cached admin pages are shared.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        "LOCATION": os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -6,6 +6,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.urls import reverse
+from django.db.models import F
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from .models import Company, Department, Employee, UserProfile, LogData
@@ -23,10 +24,12 @@ class UserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline,)
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_staff', 'get_nfc_uid']
     
+    def get_queryset(self, request):
+        # Read the UID through a LEFT JOIN instead of probing obj.profile per row
+        return super().get_queryset(request).annotate(_nfc_uid=F('profile__nfc_uid'))
+    
     def get_nfc_uid(self, obj):
-        if hasattr(obj, 'profile') and obj.profile.nfc_uid:
-            return obj.profile.nfc_uid
-        return '-'
+        return obj._nfc_uid or '-'
     get_nfc_uid.short_description = _('NFC UID')
 
 
@@ -60,6 +63,7 @@ class DepartmentAdmin(ImportExportModelAdmin):
     list_display = ['code', 'name', 'company', 'manager', 'active', 'created_at']
     list_filter = ['company', 'active', 'created_at']
     search_fields = ['code', 'name', 'company__name']
+    list_select_related = ('company', 'manager')
     autocomplete_fields = ['company', 'manager']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
@@ -78,6 +82,7 @@ class EmployeeAdmin(ImportExportModelAdmin):
     list_display = ['employee_id', 'full_name', 'email', 'department', 'role', 'nfc_status', 'active']
     list_filter = ['role', 'active', 'department', 'hire_date']
     search_fields = ['employee_id', 'first_name', 'last_name', 'email', 'nfc_uid']
+    list_select_related = ('department__company',)
     autocomplete_fields = ['department']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'hire_date'
@@ -125,11 +130,12 @@ class LogDataAdmin(admin.ModelAdmin):
     list_display = ['timestamp', 'user', 'employee', 'action_type', 'model_name', 'short_description', 'ip_address']
     list_filter = ['action_type', 'model_name', 'timestamp']
     search_fields = ['user__username', 'employee__employee_id', 'description', 'ip_address', 'nfc_uid']
+    list_select_related = ('user', 'employee')
     readonly_fields = ['timestamp', 'user', 'employee', 'action_type', 'model_name', 
                       'object_id', 'description', 'ip_address', 'device_info', 'nfc_uid']
     date_hierarchy = 'timestamp'
     
-    def has_add_permission(self, request):
+    def has_add_permission(self, request, obj=None):
         return False
     
     def has_change_permission(self, request, obj=None):
@@ -0,0 +1,113 @@
+"""
+Shared ModelAdmin mixins
+"""
+
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models.functions import Now
+from django.utils import timezone
+
+
+class ChangelistDeferMixin:
+    """Leave bulky columns out of changelist queries; change forms still load them
+
+    List them in `changelist_defer` on the admin. Put the mixin before
+    ModelAdmin / ImportExportModelAdmin in the bases.
+    """
+    changelist_defer = ()
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        changelist = f'{self.opts.app_label}_{self.opts.model_name}_changelist'
+        if self.changelist_defer and match and match.url_name == changelist:
+            queryset = queryset.defer(*self.changelist_defer)
+        return queryset
+
+
+class NowInitialMixin:
+    """Prefill form fields whose database default is Now() with the current time
+
+    db_default only applies on INSERT, so without this the add form would show
+    those datetime fields empty.
+    """
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if isinstance(db_field.db_default, Now):
+            kwargs.setdefault('initial', timezone.now)
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+
+class ChangedFieldsSaveMixin:
+    """Save only the columns a change form actually edited
+
+    Additions insert as usual; edits UPDATE the changed fields plus auto_now
+    timestamps instead of rewriting every column (long notes included).
+    """
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        fields = [field for field in obj._meta.concrete_fields if not field.primary_key]
+        update_fields = {field.name for field in fields if field.name in form.changed_data}
+        update_fields |= {field.name for field in fields if getattr(field, 'auto_now', False)}
+        obj.save(update_fields=update_fields)
+
+
+class PrefetchedAutocompleteSelect(AutocompleteSelect):
+    """AutocompleteSelect that can be handed its selected object up front
+
+    The stock widget queries for its selected option every time it renders.
+    `selected_objects` ({str(pk): obj}) is filled by InlineAutocompleteMixin.
+    """
+    selected_objects = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected_objects is None:
+            return super().optgroups(name, value, attr)
+        # An empty __in lookup is answered without a query: this only adds the blank option
+        groups = super().optgroups(name, [], attr)
+        options = groups[0][1]
+        for selected in value:
+            obj = self.selected_objects.get(str(selected))
+            if obj is not None:
+                label = self.choices.field.label_from_instance(obj)
+                options.append(self.create_option(name, obj.pk, label, True, len(options)))
+                break
+        return groups
+
+
+class InlineAutocompleteMixin:
+    """Look up the selected items of an inline's autocomplete fields once per field
+
+    Otherwise every row's widget runs its own query, so an inline with N rows
+    repeats the same lookup N times.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if 'widget' not in kwargs and db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = PrefetchedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        names = [
+            name for name in self.get_autocomplete_fields(request) if name in formset.form.base_fields
+        ]
+
+        class AutocompleteFormSet(formset):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if self.is_bound:
+                    # Submitted values aren't validated yet; let the widgets look them up
+                    return
+                for name in names:
+                    values = {form[name].value() for form in self.forms} - {None, ''}
+                    queryset = self.form.base_fields[name].queryset
+                    selected = {str(item.pk): item for item in queryset.filter(pk__in=values)} if values else {}
+                    for form in self.forms:
+                        widget = form.fields[name].widget
+                        getattr(widget, 'widget', widget).selected_objects = selected
+
+        return AutocompleteFormSet
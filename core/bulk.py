@@ -0,0 +1,82 @@
+"""
+Bulk insert helpers
+COPY-based loading of unsaved model instances on PostgreSQL
+"""
+
+import csv
+import io
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models.expressions import DatabaseDefault
+
+
+def copy_insert(objs, using='default'):
+    """Stream unsaved instances of one model into its table with COPY FROM STDIN
+
+    Columns left to db_default are omitted so the database fills them in;
+    instances are grouped by the columns they provide. Instances without a
+    primary key get one drawn from the table's sequence before the COPY, so
+    callers can refer to the new rows (and spot rows already written).
+    """
+    model = type(objs[0])
+    pk = model._meta.pk
+    fields = [field for field in model._meta.concrete_fields if not field.generated]
+    table = model._meta.db_table
+    
+    missing = [obj for obj in objs if obj.pk is None]
+    if missing:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [table, pk.column, len(missing)]
+            )
+            for obj, (value,) in zip(missing, cursor.fetchall()):
+                obj.pk = value
+    
+    groups = defaultdict(list)
+    for obj in objs:
+        # pre_save fills auto_now/auto_now_add stamps the same way save() would
+        values = [(field.column, field.pre_save(obj, add=True)) for field in fields]
+        values = [(column, value) for column, value in values if not isinstance(value, DatabaseDefault)]
+        groups[tuple(column for column, _ in values)].append([value for _, value in values])
+
+    connection = connections[using]
+    # wrap_database_errors turns driver errors from the raw cursor into Django's
+    # (IntegrityError etc.), as cursor.execute() would
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        raw = cursor.cursor
+        for columns, rows in groups.items():
+            sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+            if hasattr(raw, 'copy'):
+                # psycopg 3 adapts and escapes each value itself
+                with raw.copy(sql) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                # psycopg2 - unquoted empty CSV fields load as NULL
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                raw.copy_expert(f'{sql} WITH (FORMAT csv)', buffer)
+    
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = using
+
+
+def bulk_insert(objs, using='default', batch_size=1000):
+    """Insert unsaved instances in as few round-trips as the backend allows
+
+    COPY on PostgreSQL, bulk_create elsewhere. Neither fires save signals;
+    both leave the primary keys set on the instances. Returns the number of
+    rows written.
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    if connections[using].vendor == 'postgresql':
+        copy_insert(objs, using)
+    else:
+        type(objs[0]).objects.using(using).bulk_create(objs, batch_size=batch_size)
+    return len(objs)
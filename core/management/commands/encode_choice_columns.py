@@ -0,0 +1,52 @@
+"""
+Management command to convert string choice values to their integer codes
+Usage: python manage.py encode_choice_columns
+
+Run once on an existing database BEFORE migrating to the SmallIntegerField
+choice columns: it rewrites 'in_progress' -> '3' etc. in place so the
+migration's ALTER COLUMN ... TYPE smallint can cast every row.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+# model label -> (field, IntegerChoices attribute on the model)
+CHOICE_COLUMNS = [
+    ('mes.Machine', 'status', 'Status'),
+    ('mes.WorkOrder', 'status', 'Status'),
+    ('mes.ProductionLog', 'action_type', 'Action'),
+    ('mes.Downtime', 'reason', 'Reason'),
+    ('mrp.Material', 'material_type', 'MaterialType'),
+    ('mrp.StockMovement', 'movement_type', 'MovementType'),
+    ('mrp.PurchaseRequest', 'status', 'Status'),
+    ('mrp.MRPCalculation', 'status', 'Status'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Rewrite legacy string choice values as integer codes ahead of the column type change'
+
+    def handle(self, *args, **options):
+        quote = connection.ops.quote_name
+        with transaction.atomic(), connection.cursor() as cursor:
+            for label, field_name, choices_name in CHOICE_COLUMNS:
+                model = apps.get_model(label)
+                choices = getattr(model, choices_name)
+                table = quote(model._meta.db_table)
+                column = quote(model._meta.get_field(field_name).column)
+
+                whens = ' '.join('WHEN %s THEN %s' for _ in choices)
+                params = []
+                for member in choices:
+                    params += [member.name.lower(), str(member.value)]
+                names = [member.name.lower() for member in choices]
+                placeholders = ', '.join(['%s'] * len(names))
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = CASE {column} {whens} END '
+                    f'WHERE {column} IN ({placeholders})',
+                    params + names
+                )
+                self.stdout.write(f'  {model._meta.db_table}.{field_name}: {cursor.rowcount} rows')
+
+        self.stdout.write(self.style.SUCCESS('Choice columns encoded; now run migrate.'))
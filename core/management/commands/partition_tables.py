@@ -0,0 +1,52 @@
+"""
+Management command to maintain monthly partitions of log tables
+Usage: python manage.py partition_tables [--convert] [--months-ahead 3]
+
+Schedule it monthly (cron) so partitions exist before rows arrive.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.partitioning import (
+    partitioned_models, is_partitioned, ensure_partitions, convert_to_partitioned
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions for partitioned log tables (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Rebuild tables that are not partitioned yet (locks them while copying)'
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='How many months of partitions to create in advance'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Partitioning needs PostgreSQL - nothing to do.'))
+            return
+
+        months_ahead = options['months_ahead']
+        for model, column in partitioned_models():
+            table = model._meta.db_table
+            if not is_partitioned(table):
+                if not options['convert']:
+                    self.stdout.write(self.style.WARNING(
+                        f'{table} is not partitioned; run with --convert to rebuild it.'
+                    ))
+                    continue
+                convert_to_partitioned(model, column, months_ahead)
+                self.stdout.write(self.style.SUCCESS(f'{table} converted to monthly partitions by {column}.'))
+                continue
+
+            created = ensure_partitions(model, column, date.today(), months_ahead)
+            for name in created:
+                self.stdout.write(f'  created {name}')
+            self.stdout.write(self.style.SUCCESS(f'{table}: {len(created)} partitions created.'))
@@ -16,6 +16,7 @@ from erp.models import (ProductCategory, Product, Supplier, Customer,
                         Invoice, Payment)
 from mes.models import ProductionLine, Shift, Machine, WorkOrder, ProductionLog, QualityCheck, Downtime
 from mrp.models import Material, BOM, BOMLine, Inventory, ReorderRule, StockMovement, PurchaseRequest
+from mrp.matviews import batched_refreshes
 
 
 class Command(BaseCommand):
@@ -24,20 +25,22 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write('Starting data seeding...')
         
-        # Create superuser
-        self.create_users()
-        
-        # Core data
-        self.create_core_data()
-        
-        # ERP data
-        self.create_erp_data()
-        
-        # MES data
-        self.create_mes_data()
-        
-        # MRP data
-        self.create_mrp_data()
+        # Refresh the materialized views once at the end, not once per saved row
+        with batched_refreshes():
+            # Create superuser
+            self.create_users()
+            
+            # Core data
+            self.create_core_data()
+            
+            # ERP data
+            self.create_erp_data()
+            
+            # MES data
+            self.create_mes_data()
+            
+            # MRP data
+            self.create_mrp_data()
         
         self.stdout.write(self.style.SUCCESS('Data seeding completed!'))
     
@@ -207,7 +210,7 @@ class Command(BaseCommand):
                 total += qty * unit_price
             
             so.total_amount = total
-            so.save()
+            so.save(update_fields=['total_amount', 'updated_at'])
             
             # Create invoices for confirmed/shipped orders
             if so.status in ['shipped', 'ready']:
@@ -267,7 +270,7 @@ class Command(BaseCommand):
                 total += qty * unit_price
             
             po.total_amount = total
-            po.save()
+            po.save(update_fields=['total_amount', 'updated_at'])
         
         self.stdout.write(self.style.SUCCESS('Created ERP master data with orders and invoices'))
 
@@ -311,7 +314,7 @@ class Command(BaseCommand):
                     machine_code=f'MCH{str(machine_counter).zfill(3)}',
                     name=f'Machine {machine_counter} - {line.line_code}',
                     production_line=line,
-                    status='operational',
+                    status=Machine.Status.OPERATIONAL,
                     last_maintenance=timezone.now().date() - timedelta(days=random.randint(1, 30))
                 )
                 machine_counter += 1
@@ -351,7 +354,7 @@ class Command(BaseCommand):
                     planned_end=work_date.replace(hour=16, minute=0, second=0, microsecond=0),
                     actual_start=work_date.replace(hour=8, minute=15, second=0, microsecond=0),
                     actual_end=work_date.replace(hour=15, minute=45, second=0, microsecond=0),
-                    status='completed',
+                    status=WorkOrder.Status.COMPLETED,
                     priority=random.randint(1, 10)
                 )
                 wo_counter += 1
@@ -365,7 +368,7 @@ class Command(BaseCommand):
                         work_order=wo,
                         operator=operator,
                         shift=shift,
-                        action_type='start',
+                        action_type=ProductionLog.Action.START,
                         timestamp=wo.actual_start,
                         quantity=Decimal('0')
                     )
@@ -374,7 +377,7 @@ class Command(BaseCommand):
                         work_order=wo,
                         operator=operator,
                         shift=shift,
-                        action_type='stop',
+                        action_type=ProductionLog.Action.STOP,
                         timestamp=wo.actual_end,
                         quantity=wo.produced_quantity,
                         rejects=wo.rejected_quantity
@@ -404,7 +407,10 @@ class Command(BaseCommand):
             product = random.choice(products)
             so = random.choice(sales_orders) if sales_orders else None
             
-            status_choice = ['ready', 'ready', 'in_progress', 'pending', 'pending']
+            status_choice = [
+                WorkOrder.Status.READY, WorkOrder.Status.READY, WorkOrder.Status.IN_PROGRESS,
+                WorkOrder.Status.PENDING, WorkOrder.Status.PENDING,
+            ]
             status = status_choice[i]
             
             wo = WorkOrder.objects.create(
@@ -413,11 +419,11 @@ class Command(BaseCommand):
                 product=product,
                 production_line=line,
                 planned_quantity=Decimal(str(random.randint(100, 300))),
-                produced_quantity=Decimal('50') if status == 'in_progress' else Decimal('0'),
+                produced_quantity=Decimal('50') if status == WorkOrder.Status.IN_PROGRESS else Decimal('0'),
                 rejected_quantity=Decimal('0'),
                 planned_start=timezone.now() + timedelta(days=i),
                 planned_end=timezone.now() + timedelta(days=i+1),
-                actual_start=timezone.now() if status == 'in_progress' else None,
+                actual_start=timezone.now() if status == WorkOrder.Status.IN_PROGRESS else None,
                 status=status,
                 priority=10 - i
             )
@@ -437,7 +443,10 @@ class Command(BaseCommand):
                 machine=machine,
                 start_time=downtime_start,
                 end_time=downtime_end,
-                reason=random.choice(['breakdown', 'maintenance', 'material_shortage', 'tool_change']),
+                reason=random.choice([
+                    Downtime.Reason.BREAKDOWN, Downtime.Reason.MAINTENANCE,
+                    Downtime.Reason.MATERIAL_SHORTAGE, Downtime.Reason.TOOL_CHANGE,
+                ]),
                 description=f'Sample downtime event {i+1}',
                 reported_by=Employee.objects.first()
             )
@@ -451,11 +460,11 @@ class Command(BaseCommand):
         
         # Materials
         materials = [
-            ('MAT001', 'Steel Sheet', 'raw', 50.00, 'kg'),
-            ('MAT002', 'Plastic Resin', 'raw', 30.00, 'kg'),
-            ('MAT003', 'Electronic Board', 'component', 80.00, 'pcs'),
-            ('MAT004', 'Cardboard Box', 'packaging', 2.00, 'pcs'),
-            ('MAT005', 'Copper Wire', 'raw', 15.00, 'meter'),
+            ('MAT001', 'Steel Sheet', Material.MaterialType.RAW, 50.00, 'kg'),
+            ('MAT002', 'Plastic Resin', Material.MaterialType.RAW, 30.00, 'kg'),
+            ('MAT003', 'Electronic Board', Material.MaterialType.COMPONENT, 80.00, 'pcs'),
+            ('MAT004', 'Cardboard Box', Material.MaterialType.PACKAGING, 2.00, 'pcs'),
+            ('MAT005', 'Copper Wire', Material.MaterialType.RAW, 15.00, 'meter'),
         ]
         
         for code, name, mat_type, cost, unit in materials:
@@ -534,7 +543,11 @@ class Command(BaseCommand):
             days_ago = random.randint(0, 7)
             movement_date = today - timedelta(days=days_ago)
             
-            movement_type = random.choice(['in', 'out', 'production', 'consumption', 'adjustment'])
+            movement_type = random.choice([
+                StockMovement.MovementType.IN, StockMovement.MovementType.OUT,
+                StockMovement.MovementType.PRODUCTION, StockMovement.MovementType.CONSUMPTION,
+                StockMovement.MovementType.ADJUSTMENT,
+            ])
             
             if random.choice([True, False]):
                 # Product movement
@@ -543,8 +556,8 @@ class Command(BaseCommand):
                     movement_number=f'SM-PROD-{today.strftime("%Y%m%d")}-{str(i+1).zfill(3)}',
                     movement_type=movement_type,
                     product=product,
-                    to_warehouse='Main' if movement_type == 'in' else None,
-                    from_warehouse='Main' if movement_type == 'out' else None,
+                    to_warehouse='Main' if movement_type == StockMovement.MovementType.IN else None,
+                    from_warehouse='Main' if movement_type == StockMovement.MovementType.OUT else None,
                     quantity=Decimal(str(random.randint(10, 50))),
                     unit=product.unit,
                     movement_date=movement_date
@@ -556,24 +569,28 @@ class Command(BaseCommand):
                     movement_number=f'SM-MAT-{today.strftime("%Y%m%d")}-{str(i+1).zfill(3)}',
                     movement_type=movement_type,
                     material=material,
-                    to_warehouse='Main' if movement_type == 'in' else None,
-                    from_warehouse='Main' if movement_type == 'out' else None,
+                    to_warehouse='Main' if movement_type == StockMovement.MovementType.IN else None,
+                    from_warehouse='Main' if movement_type == StockMovement.MovementType.OUT else None,
                     quantity=Decimal(str(random.randint(5, 30))),
                     unit=material.unit,
                     movement_date=movement_date
                 )
         
         # Purchase Requests - some pending
-        for i in range(random.randint(3, 7)):
+        # Distinct dates: only one draft per material and date is allowed
+        for i, days in enumerate(random.sample(range(7, 31), random.randint(3, 7))):
             material = random.choice(list(Material.objects.all()))
-            required_date = timezone.now().date() + timedelta(days=random.randint(7, 30))
+            required_date = timezone.now().date() + timedelta(days=days)
             
             PurchaseRequest.objects.create(
                 pr_number=f'PR-{timezone.now().strftime("%Y%m%d")}-{str(i+1).zfill(3)}',
                 material=material,
                 requested_quantity=Decimal(str(random.randint(50, 200))),
                 required_date=required_date,
-                status=random.choice(['pending', 'approved', 'draft']),
+                status=random.choice([
+                    PurchaseRequest.Status.PENDING, PurchaseRequest.Status.APPROVED,
+                    PurchaseRequest.Status.DRAFT,
+                ]),
                 requested_by=Employee.objects.first()
             )
         
@@ -0,0 +1,47 @@
+"""
+Core Middleware
+Development-time detection of repeated (N+1) queries
+"""
+
+import logging
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+REPEATED_QUERIES_HEADER = 'X-Repeated-Queries'
+
+# Strip literals so queries that only differ by their parameters compare equal
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class RepeatedQueryMiddleware:
+    """Warn when one query shape runs more than QUERY_REPEAT_LIMIT times in a request
+
+    Meant for DEBUG only (see settings). Offending responses carry an
+    X-Repeated-Queries header with the worst count, so a crawl of the admin
+    changelists can assert on it.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limit = getattr(settings, 'QUERY_REPEAT_LIMIT', 2)
+
+    def __call__(self, request):
+        shapes = Counter()
+
+        def count_query(execute, sql, params, many, context):
+            shapes[_LITERALS.sub('?', sql)] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+
+        repeated = [(sql, count) for sql, count in shapes.items() if count > self.limit]
+        if repeated:
+            sql, count = max(repeated, key=lambda item: item[1])
+            logger.warning('Query ran %d times in %s %s: %s', count, request.method, request.path, sql)
+            response[REPEATED_QUERIES_HEADER] = str(count)
+        return response
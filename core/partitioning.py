@@ -0,0 +1,181 @@
+"""
+Time-range partitioning for append-only log tables (PostgreSQL only)
+
+Tables listed in PARTITIONED_MODELS are partitioned by month on the given
+column. `python manage.py partition_tables --convert` turns an existing table
+into a partitioned one; running the command without flags (monthly, e.g. from
+cron) creates the upcoming monthly partitions ahead of time.
+
+PostgreSQL only allows unique constraints on a partitioned table when they
+include the partition key. The primary key therefore becomes (id, column), and
+each other unique field is kept globally unique through a small unpartitioned
+`<table>_<field>_uniq` table maintained by a trigger.
+"""
+
+from datetime import date
+
+from django.apps import apps
+from django.db import connection, transaction
+
+# model label -> partition key column
+PARTITIONED_MODELS = {
+    'mes.ProductionLog': 'timestamp',
+    'mrp.StockMovement': 'movement_date',
+}
+
+
+def _month_start(value, offset=0):
+    month = value.year * 12 + value.month - 1 + offset
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _create_partition(cursor, table, column, name, month):
+    start, end = month, _month_start(month, 1)
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {column} >= %s AND {column} < %s)',
+        [start, end]
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        return
+
+    # DEFAULT already holds rows for this month, so the range can't be claimed
+    # while it is attached. Detach it, fill the new partition from it and
+    # attach both. The moved rows never pass through the parent, so the
+    # unique-field triggers don't see them leave and re-enter.
+    cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {table}_default')
+    cursor.execute(f'CREATE TABLE {name} (LIKE {table})')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {table}_default WHERE {column} >= %s AND {column} < %s '
+        f'RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT')
+
+
+def ensure_partitions(model, column, start, months_ahead=3):
+    """Create monthly partitions from `start` through `months_ahead` months from now
+
+    Rows already sitting in the DEFAULT partition for a new month are moved
+    into it.
+    """
+    table = model._meta.db_table
+    first = _month_start(start)
+    last = _month_start(date.today(), months_ahead)
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT')
+        month = first
+        while month <= last:
+            name = f'{table}_p{month:%Y%m}'
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+            if cursor.fetchone() is None:
+                _create_partition(cursor, table, column, name, month)
+                created.append(name)
+            month = _month_start(month, 1)
+    return created
+
+
+def _add_unique_registry(cursor, table, field):
+    """Enforce `field`'s uniqueness across all partitions"""
+    registry = f'{table}_{field.column}_uniq'
+    cursor.execute(
+        f'CREATE TABLE {registry} ({field.column} {field.db_type(connection)} PRIMARY KEY)'
+    )
+    cursor.execute(
+        f'INSERT INTO {registry} SELECT {field.column} FROM {table} WHERE {field.column} IS NOT NULL'
+    )
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION {registry}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                DELETE FROM {registry} WHERE {field.column} = OLD.{field.column};
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW.{field.column} IS NOT NULL THEN
+                INSERT INTO {registry} VALUES (NEW.{field.column});
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    cursor.execute(
+        f'CREATE TRIGGER {registry}_sync AFTER INSERT OR DELETE OR UPDATE OF {field.column} '
+        f'ON {table} FOR EACH ROW EXECUTE FUNCTION {registry}_sync()'
+    )
+
+
+def convert_to_partitioned(model, column, months_ahead=3):
+    """Rebuild `model`'s table as PARTITION BY RANGE (column), keeping its rows
+
+    The primary key becomes (id, column) because PostgreSQL requires unique
+    constraints on a partitioned table to include the partition key; ids still
+    come from an identity sequence so the ORM keeps treating id as the pk.
+    Indexes (including ones added outside the models, e.g. BRIN) and foreign
+    keys are carried over under their existing names.
+    Takes an exclusive lock for the duration - run it in a maintenance window.
+    """
+    table = model._meta.db_table
+    old = f'{table}_unpartitioned'
+    unique_fields = [
+        field for field in model._meta.local_fields if field.unique and not field.primary_key
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT MIN({column}) FROM {table}')
+        earliest = cursor.fetchone()[0] or date.today()
+
+        # Captured before the rename so the definitions still name `table`;
+        # indexes backing the pk / unique constraints are rebuilt separately
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table]
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+        cursor.execute(
+            f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING GENERATED) PARTITION BY RANGE ({column})'
+        )
+        ensure_partitions(model, column, earliest, months_ahead)
+
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        )
+        cursor.execute(f'DROP TABLE {old}')
+
+        # Added once the old table (and its index/constraint names) is gone
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {column})')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}')
+        for sql in indexes:
+            cursor.execute(sql)
+        for field in unique_fields:
+            # Lookups by the unique column still need an index of their own
+            cursor.execute(f'CREATE INDEX {table}_{field.column}_idx ON {table} ({field.column})')
+            _add_unique_registry(cursor, table, field)
+
+
+def partitioned_models():
+    for label, column in PARTITIONED_MODELS.items():
+        yield apps.get_model(label), column
@@ -36,9 +36,8 @@ class RequestMiddleware:
         return response
 
 
-def create_log(action_type, description, user=None, employee=None, model_name=None, 
-               object_id=None, nfc_uid=None):
-    """Helper function to create log entries"""
+def _request_context(user=None, employee=None):
+    """User, employee, IP address and device info of the current request"""
     request = get_current_request()
     
     ip_address = None
@@ -54,19 +53,36 @@ def create_log(action_type, description, user=None, employee=None, model_name=No
         if not employee and hasattr(request.user, 'profile') and request.user.profile.employee:
             employee = request.user.profile.employee
     
+    return {'user': user, 'employee': employee, 'ip_address': ip_address, 'device_info': device_info}
+
+
+def create_log(action_type, description, user=None, employee=None, model_name=None, 
+               object_id=None, nfc_uid=None):
+    """Helper function to create log entries"""
     LogData.objects.create(
-        user=user,
-        employee=employee,
         action_type=action_type,
         model_name=model_name,
         object_id=object_id,
         description=description,
-        ip_address=ip_address,
-        device_info=device_info,
-        nfc_uid=nfc_uid
+        nfc_uid=nfc_uid,
+        **_request_context(user, employee)
     )
 
 
+def create_logs(action_type, model_name, entries, using='default'):
+    """Write one log entry per (object_id, description) pair in a single INSERT
+    
+    For rows written with bulk_create, COPY or queryset.update(), which bypass
+    the post_save/post_delete logging below.
+    """
+    context = _request_context()
+    LogData.objects.using(using).bulk_create([
+        LogData(action_type=action_type, model_name=model_name, object_id=object_id,
+                description=description, **context)
+        for object_id, description in entries
+    ])
+
+
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     """Log user login"""
@@ -35,29 +35,33 @@ def get_kpis():
     
     # Production KPIs
     wo_this_month = WorkOrder.objects.filter(planned_start__gte=month_start)
-    completed_wo = wo_this_month.filter(status='completed')
+    completed_wo = wo_this_month.filter(status=WorkOrder.Status.COMPLETED)
     
     total_produced = completed_wo.aggregate(total=Sum('produced_quantity'))['total'] or 0
     total_rejected = completed_wo.aggregate(total=Sum('rejected_quantity'))['total'] or 0
     
     # OEE calculation (simplified)
+    # One pass over the schedule columns; an empty month simply averages to 0
     oee = 0
-    if completed_wo.exists():
-        efficiency_avg = 0
-        count = 0
-        for wo in completed_wo:
-            if wo.efficiency:
-                efficiency_avg += wo.efficiency
-                count += 1
-        oee = (efficiency_avg / count) if count > 0 else 0
+    efficiency_avg = 0
+    count = 0
+    for wo in completed_wo.only('planned_start', 'planned_end', 'actual_start', 'actual_end'):
+        if wo.efficiency:
+            efficiency_avg += wo.efficiency
+            count += 1
+    if count:
+        oee = efficiency_avg / count
     
     # Financial KPIs
     invoices_this_month = Invoice.objects.filter(invoice_date__gte=month_start, invoice_type='sales')
     revenue = invoices_this_month.aggregate(total=Sum('total'))['total'] or 0
     
-    # Inventory value
+    # Inventory value - item costs joined in, and only the three columns read
     inventory_value = 0
-    for inv in Inventory.objects.all():
+    stock = Inventory.objects.select_related('product', 'material').only(
+        'quantity_on_hand', 'product__cost', 'material__unit_cost'
+    )
+    for inv in stock:
         if inv.product:
             inventory_value += inv.quantity_on_hand * inv.product.cost
         elif inv.material:
@@ -76,8 +80,10 @@ def get_kpis():
         'rejection_rate': round((total_rejected / total_produced * 100) if total_produced > 0 else 0, 2),
         'revenue': float(revenue),
         'inventory_value': float(inventory_value),
-        'active_work_orders': WorkOrder.objects.filter(status='in_progress').count(),
-        'pending_work_orders': WorkOrder.objects.filter(status__in=['pending', 'ready']).count(),
+        'active_work_orders': WorkOrder.objects.filter(status=WorkOrder.Status.IN_PROGRESS).count(),
+        'pending_work_orders': WorkOrder.objects.filter(
+            status__in=[WorkOrder.Status.PENDING, WorkOrder.Status.READY]
+        ).count(),
         'low_stock_items': low_stock_count,
     }
 
@@ -93,7 +99,7 @@ def get_production_data():
         date = last_7_days + timedelta(days=i)
         produced = WorkOrder.objects.filter(
             actual_start__date=date,
-            status='completed'
+            status=WorkOrder.Status.COMPLETED
         ).aggregate(total=Sum('produced_quantity'))['total'] or 0
         
         daily_production.append({
@@ -107,7 +113,7 @@ def get_production_data():
         produced = WorkOrder.objects.filter(
             production_line=line,
             actual_start__gte=last_7_days,
-            status='completed'
+            status=WorkOrder.Status.COMPLETED
         ).aggregate(total=Sum('produced_quantity'))['total'] or 0
         
         line_production.append({
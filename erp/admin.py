@@ -15,6 +15,7 @@ from .models import (
     SalesOrder, SalesOrderLine,
     Invoice, Payment
 )
+from core.admin_mixins import InlineAutocompleteMixin
 from import_export.admin import ImportExportModelAdmin
 
 
@@ -23,20 +24,24 @@ class ProductCategoryAdmin(ImportExportModelAdmin):
     list_display = ['code', 'name', 'parent', 'active', 'product_count']
     list_filter = ['active', 'parent']
     search_fields = ['code', 'name']
+    list_select_related = ('parent',)
     autocomplete_fields = ['parent']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_product_count=Count('products'))
+    
     def product_count(self, obj):
-        count = obj.products.count()
-        return format_html('<b>{}</b>', count)
+        return format_html('<b>{}</b>', obj._product_count)
     product_count.short_description = _('Products')
 
 
 @admin.register(Product)
 class ProductAdmin(ImportExportModelAdmin):
-    list_display = ['product_number', 'name', 'category', 'product_type', 'price', 'cost', 
+    list_display = ['product_number', 'name', 'category', 'product_type', 'material_code', 'price', 'cost', 
                    'margin_display', 'stock_status', 'active']
     list_filter = ['product_type', 'active', 'category']
     search_fields = ['product_number', 'name', 'sku', 'barcode']
+    list_select_related = ('category',)
     autocomplete_fields = ['category']
     readonly_fields = ['created_at', 'updated_at', 'margin_display']
     
@@ -93,10 +98,12 @@ class SupplierAdmin(ImportExportModelAdmin):
     list_filter = ['active', 'created_at']
     search_fields = ['supplier_code', 'name', 'email', 'contact_person']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_po_count=Count('purchase_orders'))
+    
     def po_count(self, obj):
-        count = obj.purchase_orders.count()
         url = reverse('admin:erp_purchaseorder_changelist') + f'?supplier__id__exact={obj.id}'
-        return format_html('<a href="{}">{}</a>', url, count)
+        return format_html('<a href="{}">{}</a>', url, obj._po_count)
     po_count.short_description = _('POs')
 
 
@@ -107,19 +114,25 @@ class CustomerAdmin(ImportExportModelAdmin):
     list_filter = ['active', 'created_at']
     search_fields = ['customer_code', 'name', 'email', 'contact_person']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_so_count=Count('sales_orders'))
+    
     def so_count(self, obj):
-        count = obj.sales_orders.count()
         url = reverse('admin:erp_salesorder_changelist') + f'?customer__id__exact={obj.id}'
-        return format_html('<a href="{}">{}</a>', url, count)
+        return format_html('<a href="{}">{}</a>', url, obj._so_count)
     so_count.short_description = _('SOs')
 
 
-class PurchaseOrderLineInline(admin.TabularInline):
+class PurchaseOrderLineInline(InlineAutocompleteMixin, admin.TabularInline):
     model = PurchaseOrderLine
     extra = 1
     autocomplete_fields = ['product']
     fields = ['product', 'quantity', 'unit_price', 'total_price', 'received_quantity']
     readonly_fields = ['total_price']
+    
+    def get_queryset(self, request):
+        # Each inline row prints str(line), which reads its order and product
+        return super().get_queryset(request).select_related('purchase_order', 'product')
 
 
 @admin.register(PurchaseOrder)
@@ -128,6 +141,7 @@ class PurchaseOrderAdmin(ImportExportModelAdmin):
                    'status_badge', 'total_amount', 'created_by']
     list_filter = ['status', 'order_date', 'expected_date']
     search_fields = ['po_number', 'supplier__name']
+    list_select_related = ('supplier', 'created_by')
     autocomplete_fields = ['supplier', 'created_by']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'order_date'
@@ -149,6 +163,8 @@ class PurchaseOrderAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(PurchaseOrder.STATUS_CHOICES)
+    
     def status_badge(self, obj):
         colors = {
             'draft': 'gray',
@@ -160,7 +176,7 @@ class PurchaseOrderAdmin(ImportExportModelAdmin):
         color = colors.get(obj.status, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
+            color, self._DISPLAY.get(obj.status, obj.status)
         )
     status_badge.short_description = _('Status')
     
@@ -177,12 +193,16 @@ class PurchaseOrderAdmin(ImportExportModelAdmin):
     mark_as_confirmed.short_description = _('Mark as Confirmed')
 
 
-class SalesOrderLineInline(admin.TabularInline):
+class SalesOrderLineInline(InlineAutocompleteMixin, admin.TabularInline):
     model = SalesOrderLine
     extra = 1
     autocomplete_fields = ['product']
     fields = ['product', 'quantity', 'unit_price', 'total_price', 'shipped_quantity']
     readonly_fields = ['total_price']
+    
+    def get_queryset(self, request):
+        # Each inline row prints str(line), which reads its order and product
+        return super().get_queryset(request).select_related('sales_order', 'product')
 
 
 @admin.register(SalesOrder)
@@ -191,6 +211,7 @@ class SalesOrderAdmin(ImportExportModelAdmin):
                    'status_badge', 'total_amount', 'created_by']
     list_filter = ['status', 'order_date', 'delivery_date']
     search_fields = ['so_number', 'customer__name']
+    list_select_related = ('customer', 'created_by')
     autocomplete_fields = ['customer', 'created_by']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'order_date'
@@ -212,6 +233,8 @@ class SalesOrderAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(SalesOrder.STATUS_CHOICES)
+    
     def status_badge(self, obj):
         colors = {
             'draft': 'gray',
@@ -225,7 +248,7 @@ class SalesOrderAdmin(ImportExportModelAdmin):
         color = colors.get(obj.status, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
+            color, self._DISPLAY.get(obj.status, obj.status)
         )
     status_badge.short_description = _('Status')
     
@@ -269,6 +292,8 @@ class InvoiceAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(Invoice.STATUS_CHOICES)
+    
     def status_badge(self, obj):
         colors = {
             'draft': 'gray',
@@ -280,7 +305,7 @@ class InvoiceAdmin(ImportExportModelAdmin):
         color = colors.get(obj.status, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
+            color, self._DISPLAY.get(obj.status, obj.status)
         )
     status_badge.short_description = _('Status')
     
@@ -298,6 +323,7 @@ class PaymentAdmin(ImportExportModelAdmin):
                    'payment_method', 'created_by']
     list_filter = ['payment_method', 'payment_date']
     search_fields = ['payment_number', 'invoice__invoice_number', 'reference']
+    list_select_related = ('invoice', 'created_by')
     autocomplete_fields = ['invoice', 'created_by']
     readonly_fields = ['created_at']
     date_hierarchy = 'payment_date'
@@ -65,6 +65,15 @@ class Product(models.Model):
     price = models.DecimalField(_("Selling Price"), max_digits=15, decimal_places=2, default=0)
     cost = models.DecimalField(_("Cost"), max_digits=15, decimal_places=2, default=0)
     
+    # Copied from the linked mrp.Material by mrp.signals, so product and
+    # inventory listings don't have to join through material_detail
+    material_code = models.CharField(
+        _("Material Code"), max_length=100, blank=True, null=True, editable=False
+    )
+    material_unit_cost = models.DecimalField(
+        _("Material Unit Cost"), max_digits=12, decimal_places=2, blank=True, null=True, editable=False
+    )
+    
     # Inventory
     unit = models.CharField(_("Unit"), max_length=50, default='pcs')
     min_stock = models.DecimalField(_("Min Stock"), max_digits=12, decimal_places=2, default=0)
@@ -102,6 +111,8 @@ class Product(models.Model):
         """Auto-generate SKU if not provided"""
         if not self.sku:
             self.sku = f"SKU-{self.product_number}"
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'sku'}
         super().save(*args, **kwargs)
 
 
@@ -220,6 +231,10 @@ class PurchaseOrderLine(models.Model):
 
     def save(self, *args, **kwargs):
         self.total_price = self.quantity * self.unit_price
+        # Keep the derived total in step when only some columns are saved
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'quantity', 'unit_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'total_price'}
         super().save(*args, **kwargs)
 
 
@@ -295,6 +310,10 @@ class SalesOrderLine(models.Model):
 
     def save(self, *args, **kwargs):
         self.total_price = self.quantity * self.unit_price
+        # Keep the derived total in step when only some columns are saved
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'quantity', 'unit_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'total_price'}
         super().save(*args, **kwargs)
 
 
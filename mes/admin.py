@@ -7,14 +7,85 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.urls import reverse, path
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.translation import get_language
 from .models import (
     ProductionLine, Shift, Machine, WorkOrder,
     ProductionLog, QualityCheck, Downtime
 )
+from .ingest import flush_production_logs
+from core.signals import create_logs
+from core.admin_mixins import ChangelistDeferMixin, ChangedFieldsSaveMixin, NowInitialMixin
 from import_export.admin import ImportExportModelAdmin
+from functools import lru_cache, partial
+import hashlib
+
+
+WORK_ORDER_STATUS_COLORS = {
+    WorkOrder.Status.PENDING: 'gray',
+    WorkOrder.Status.READY: 'blue',
+    WorkOrder.Status.IN_PROGRESS: 'green',
+    WorkOrder.Status.PAUSED: 'orange',
+    WorkOrder.Status.COMPLETED: 'darkgreen',
+    WorkOrder.Status.CANCELLED: 'red',
+}
+
+WORK_ORDER_STATUS_ICONS = {
+    WorkOrder.Status.PENDING: '○',
+    WorkOrder.Status.READY: '◐',
+    WorkOrder.Status.IN_PROGRESS: '⚙',
+    WorkOrder.Status.PAUSED: '⏸',
+    WorkOrder.Status.COMPLETED: '✓',
+    WorkOrder.Status.CANCELLED: '✗',
+}
+
+
+# Changelist cell renderers. Their output only depends on a few hashable
+# field values, so the rendered HTML is memoized instead of rebuilt per row.
+# Pass translated labels as str so each language gets its own cache entry.
+
+@lru_cache(maxsize=4096)
+def _render_status(status, is_delayed, display):
+    color = WORK_ORDER_STATUS_COLORS.get(status, 'gray')
+    icon = WORK_ORDER_STATUS_ICONS.get(status, '○')
+    
+    # Add red background if delayed
+    bg_style = ''
+    if is_delayed and status in (WorkOrder.Status.PENDING, WorkOrder.Status.IN_PROGRESS):
+        bg_style = 'background-color: #ffcccc; '
+    
+    return format_html(
+        '<span style="{}color: {}; font-weight: bold; padding: 3px 8px; border-radius: 3px;">{} {}</span>',
+        bg_style, color, icon, display
+    )
+
+
+@lru_cache(maxsize=4096)
+def _render_progress(percentage):
+    color = 'green' if percentage >= 100 else 'orange' if percentage >= 75 else 'blue'
+    return format_html(
+        '<div style="width: 100px; background-color: #f0f0f0; border-radius: 3px; overflow: hidden;">'
+        '<div style="width: {}%; background-color: {}; color: white; text-align: center; '
+        'padding: 2px 0; font-size: 10px; font-weight: bold;">{}%</div></div>',
+        min(percentage, 100), color, percentage
+    )
+
+
+@lru_cache(maxsize=16)
+def _render_priority(priority):
+    color = 'red' if priority <= 3 else 'orange' if priority <= 6 else 'gray'
+    return format_html(
+        '<span style="background-color: {}; color: white; padding: 2px 6px; '
+        'border-radius: 3px; font-weight: bold;">{}</span>',
+        color, priority
+    )
 
 
 @admin.register(ProductionLine)
@@ -22,10 +93,16 @@ class ProductionLineAdmin(ImportExportModelAdmin):
     list_display = ['line_code', 'name', 'department', 'capacity', 'active_wo_count', 'active']
     list_filter = ['active', 'department']
     search_fields = ['line_code', 'name']
+    list_select_related = ('department__company',)
     autocomplete_fields = ['department']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _active_wo_count=Count('work_orders', filter=Q(work_orders__status=WorkOrder.Status.IN_PROGRESS))
+        )
+    
     def active_wo_count(self, obj):
-        count = obj.work_orders.filter(status='in_progress').count()
+        count = obj._active_wo_count
         if count > 0:
             return format_html('<span style="color: green; font-weight: bold;">{}</span>', count)
         return count
@@ -45,6 +122,7 @@ class MachineAdmin(ImportExportModelAdmin):
                    'last_maintenance', 'next_maintenance', 'active']
     list_filter = ['status', 'active', 'production_line']
     search_fields = ['machine_code', 'name', 'serial_number']
+    list_select_related = ('production_line',)
     autocomplete_fields = ['production_line']
     readonly_fields = ['created_at', 'updated_at']
     
@@ -64,17 +142,19 @@ class MachineAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(Machine.STATUS_CHOICES)
+    
     def status_badge(self, obj):
         colors = {
-            'operational': 'green',
-            'maintenance': 'orange',
-            'breakdown': 'red',
-            'idle': 'gray',
+            Machine.Status.OPERATIONAL: 'green',
+            Machine.Status.MAINTENANCE: 'orange',
+            Machine.Status.BREAKDOWN: 'red',
+            Machine.Status.IDLE: 'gray',
         }
         color = colors.get(obj.status, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
+            color, self._DISPLAY.get(obj.status, obj.status)
         )
     status_badge.short_description = _('Status')
 
@@ -86,6 +166,10 @@ class ProductionLogInline(admin.TabularInline):
     readonly_fields = ['timestamp', 'operator', 'shift', 'action_type', 
                       'quantity', 'rejects', 'downtime_minutes', 'nfc_uid']
     fields = ['timestamp', 'operator', 'action_type', 'quantity', 'rejects', 'downtime_minutes']
+    
+    def get_queryset(self, request):
+        # Each row prints str(log) and its operator
+        return super().get_queryset(request).select_related('work_order', 'operator')
 
 
 class QualityCheckInline(admin.TabularInline):
@@ -93,14 +177,23 @@ class QualityCheckInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['check_number', 'check_date', 'inspector', 'result']
     fields = ['check_number', 'inspector', 'sample_size', 'passed', 'failed', 'result']
+    
+    def get_queryset(self, request):
+        # Each row shows its inspector
+        return super().get_queryset(request).select_related('inspector')
 
 
+# list_filter / date_hierarchy columns on the WorkOrder, ProductionLog,
+# QualityCheck, Downtime and Machine admins are backed by Meta.indexes in
+# mes/models.py - add an index there when adding a new filter here.
 @admin.register(WorkOrder)
-class WorkOrderAdmin(ImportExportModelAdmin):
+class WorkOrderAdmin(ChangelistDeferMixin, ChangedFieldsSaveMixin, NowInitialMixin, ImportExportModelAdmin):
     list_display = ['wo_number', 'product', 'production_line', 'status_indicator', 
                    'progress_bar', 'priority_badge', 'delay_indicator', 'action_buttons']
     list_filter = ['status', 'priority', 'production_line', 'planned_start']
     search_fields = ['wo_number', 'product__name', 'product__product_number']
+    list_select_related = ('product', 'production_line')
+    changelist_defer = ('notes',)
     autocomplete_fields = ['sales_order', 'product', 'production_line', 'created_by']
     readonly_fields = ['created_at', 'updated_at', 'completion_rate', 'efficiency', 'is_delayed']
     date_hierarchy = 'planned_start'
@@ -125,58 +218,25 @@ class WorkOrderAdmin(ImportExportModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return WorkOrder.with_metrics(super().get_queryset(request))
+    
     def get_list_display_links(self, request, list_display):
         return ['wo_number']
     
+    _DISPLAY = dict(WorkOrder.STATUS_CHOICES)
+    
     def status_indicator(self, obj):
-        colors = {
-            'pending': 'gray',
-            'ready': 'blue',
-            'in_progress': 'green',
-            'paused': 'orange',
-            'completed': 'darkgreen',
-            'cancelled': 'red',
-        }
-        icons = {
-            'pending': '○',
-            'ready': '◐',
-            'in_progress': '⚙',
-            'paused': '⏸',
-            'completed': '✓',
-            'cancelled': '✗',
-        }
-        color = colors.get(obj.status, 'gray')
-        icon = icons.get(obj.status, '○')
-        
-        # Add red background if delayed
-        bg_style = ''
-        if obj.is_delayed and obj.status in ['pending', 'in_progress']:
-            bg_style = 'background-color: #ffcccc; '
-        
-        return format_html(
-            '<span style="{}color: {}; font-weight: bold; padding: 3px 8px; border-radius: 3px;">{} {}</span>',
-            bg_style, color, icon, obj.get_status_display()
-        )
+        label = str(self._DISPLAY.get(obj.status, obj.status))
+        return _render_status(obj.status, obj.is_delayed, label)
     status_indicator.short_description = _('Status')
     
     def progress_bar(self, obj):
-        percentage = obj.completion_rate
-        color = 'green' if percentage >= 100 else 'orange' if percentage >= 75 else 'blue'
-        return format_html(
-            '<div style="width: 100px; background-color: #f0f0f0; border-radius: 3px; overflow: hidden;">'
-            '<div style="width: {}%; background-color: {}; color: white; text-align: center; '
-            'padding: 2px 0; font-size: 10px; font-weight: bold;">{}%</div></div>',
-            min(percentage, 100), color, percentage
-        )
+        return _render_progress(obj.completion_rate)
     progress_bar.short_description = _('Progress')
     
     def priority_badge(self, obj):
-        color = 'red' if obj.priority <= 3 else 'orange' if obj.priority <= 6 else 'gray'
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 2px 6px; '
-            'border-radius: 3px; font-weight: bold;">{}</span>',
-            color, obj.priority
-        )
+        return _render_priority(obj.priority)
     priority_badge.short_description = _('Priority')
     
     def delay_indicator(self, obj):
@@ -188,14 +248,14 @@ class WorkOrderAdmin(ImportExportModelAdmin):
     def action_buttons(self, obj):
         buttons = []
         
-        if obj.status == 'ready':
+        if obj.status == WorkOrder.Status.READY:
             buttons.append(
                 f'<a href="/admin/mes/workorder/{obj.id}/start/" '
                 f'class="button" style="background-color: green; color: white; '
                 f'padding: 3px 10px; border-radius: 3px; text-decoration: none;">▶ Start</a>'
             )
         
-        if obj.status == 'in_progress':
+        if obj.status == WorkOrder.Status.IN_PROGRESS:
             buttons.append(
                 f'<a href="/admin/mes/workorder/{obj.id}/pause/" '
                 f'class="button" style="background-color: orange; color: white; '
@@ -207,7 +267,7 @@ class WorkOrderAdmin(ImportExportModelAdmin):
                 f'padding: 3px 10px; border-radius: 3px; text-decoration: none;">⏹ Stop</a>'
             )
         
-        if obj.status == 'paused':
+        if obj.status == WorkOrder.Status.PAUSED:
             buttons.append(
                 f'<a href="/admin/mes/workorder/{obj.id}/resume/" '
                 f'class="button" style="background-color: blue; color: white; '
@@ -217,101 +277,105 @@ class WorkOrderAdmin(ImportExportModelAdmin):
         return format_html(' '.join(buttons))
     action_buttons.short_description = _('Actions')
     
+    # url action -> (new status, log action, timestamp field to stamp, message level, message verb)
+    _ACTIONS = {
+        'start': (WorkOrder.Status.IN_PROGRESS, ProductionLog.Action.START, 'actual_start', messages.SUCCESS, 'started'),
+        'stop': (WorkOrder.Status.COMPLETED, ProductionLog.Action.STOP, 'actual_end', messages.SUCCESS, 'completed'),
+        'pause': (WorkOrder.Status.PAUSED, ProductionLog.Action.PAUSE, None, messages.WARNING, 'paused'),
+        'resume': (WorkOrder.Status.IN_PROGRESS, ProductionLog.Action.RESUME, None, messages.SUCCESS, 'resumed'),
+    }
+    
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('<int:object_id>/start/', self.admin_site.admin_view(self.start_work_order), name='mes_workorder_start'),
-            path('<int:object_id>/stop/', self.admin_site.admin_view(self.stop_work_order), name='mes_workorder_stop'),
-            path('<int:object_id>/pause/', self.admin_site.admin_view(self.pause_work_order), name='mes_workorder_pause'),
-            path('<int:object_id>/resume/', self.admin_site.admin_view(self.resume_work_order), name='mes_workorder_resume'),
+            path(f'<int:object_id>/{action}/',
+                 self.admin_site.admin_view(partial(self._transition, action=action)),
+                 name=f'mes_workorder_{action}')
+            for action in self._ACTIONS
         ]
         return custom_urls + urls
     
-    def start_work_order(self, request, object_id):
-        work_order = WorkOrder.objects.get(pk=object_id)
-        work_order.status = 'in_progress'
-        work_order.actual_start = timezone.now()
-        work_order.save()
-        
-        # Create production log
-        ProductionLog.objects.create(
-            work_order=work_order,
-            operator=request.user.profile.employee if hasattr(request.user, 'profile') else None,
-            action_type='start',
-            timestamp=timezone.now()
-        )
-        
-        messages.success(request, _(f'Work Order {work_order.wo_number} started.'))
-        return redirect('admin:mes_workorder_change', object_id)
-    
-    def stop_work_order(self, request, object_id):
-        work_order = WorkOrder.objects.get(pk=object_id)
-        work_order.status = 'completed'
-        work_order.actual_end = timezone.now()
-        work_order.save()
-        
-        # Create production log
-        ProductionLog.objects.create(
-            work_order=work_order,
-            operator=request.user.profile.employee if hasattr(request.user, 'profile') else None,
-            action_type='stop',
-            timestamp=timezone.now()
-        )
-        
-        messages.success(request, _(f'Work Order {work_order.wo_number} completed.'))
-        return redirect('admin:mes_workorder_change', object_id)
-    
-    def pause_work_order(self, request, object_id):
-        work_order = WorkOrder.objects.get(pk=object_id)
-        work_order.status = 'paused'
-        work_order.save()
-        
-        ProductionLog.objects.create(
-            work_order=work_order,
-            operator=request.user.profile.employee if hasattr(request.user, 'profile') else None,
-            action_type='pause',
-            timestamp=timezone.now()
+    def _transition(self, request, object_id, action):
+        """Apply a start/stop/pause/resume action and write its production log"""
+        status, log_action, timestamp_field, level, verb = self._ACTIONS[action]
+        work_order = get_object_or_404(
+            WorkOrder.objects.select_related('product').only('wo_number', 'product__name'), pk=object_id
         )
+        now = timezone.now()
         
-        messages.warning(request, _(f'Work Order {work_order.wo_number} paused.'))
-        return redirect('admin:mes_workorder_change', object_id)
-    
-    def resume_work_order(self, request, object_id):
-        work_order = WorkOrder.objects.get(pk=object_id)
-        work_order.status = 'in_progress'
-        work_order.save()
+        changes = {'status': status, 'updated_at': now}
+        if timestamp_field:
+            changes[timestamp_field] = now
         
-        ProductionLog.objects.create(
-            work_order=work_order,
-            operator=request.user.profile.employee if hasattr(request.user, 'profile') else None,
-            action_type='resume',
-            timestamp=timezone.now()
-        )
+        # The status change, its log entry and their audit entries commit or
+        # roll back together; update() skips the post_save audit, so write it here
+        with transaction.atomic():
+            WorkOrder.objects.filter(pk=object_id).update(**changes)
+            create_logs('update', 'WorkOrder', [(object_id, f'WorkOrder {work_order} updated')])
+            flush_production_logs([ProductionLog(
+                work_order_id=object_id,
+                operator=request.user.profile.employee if hasattr(request.user, 'profile') else None,
+                action_type=log_action,
+                timestamp=now
+            )])
         
-        messages.success(request, _(f'Work Order {work_order.wo_number} resumed.'))
+        messages.add_message(request, level, _(f'Work Order {work_order.wo_number} {verb}.'))
         return redirect('admin:mes_workorder_change', object_id)
 
 
 @admin.register(ProductionLog)
-class ProductionLogAdmin(admin.ModelAdmin):
+class ProductionLogAdmin(ChangelistDeferMixin, ChangedFieldsSaveMixin, admin.ModelAdmin):
     list_display = ['timestamp', 'work_order', 'operator', 'shift', 'action_type', 
                    'quantity', 'rejects', 'downtime_minutes']
     list_filter = ['action_type', 'shift', 'timestamp']
     search_fields = ['work_order__wo_number', 'operator__employee_id', 'nfc_uid']
+    list_select_related = ('work_order__product', 'operator', 'shift')
+    changelist_defer = ('notes',)
     autocomplete_fields = ['work_order', 'operator', 'shift']
     readonly_fields = ['timestamp']
     date_hierarchy = 'timestamp'
     
-    def has_add_permission(self, request):
+    changelist_cache_timeout = 30
+    
+    def changelist_view(self, request, extra_context=None):
+        # Logs are append-only, so caching the rendered page for a short while
+        # keeps reloads cheap without hiding new entries for long. The key
+        # varies on the Cookie header (like vary_on_cookie) so each session gets
+        # its own copy with a valid CSRF token. cache_page itself can't be used
+        # because admin responses are marked private/no-cache.
+        if request.method != 'GET' or len(messages.get_messages(request)):
+            return super().changelist_view(request, extra_context)
+        
+        key_source = '|'.join([
+            request.get_full_path(), get_language() or '', request.META.get('HTTP_COOKIE', ''),
+        ])
+        cache_key = 'mes:productionlog:changelist:' + hashlib.md5(key_source.encode()).hexdigest()
+        content = cache.get(cache_key)
+        if content is not None:
+            # The cached page skips super().changelist_view(), permission check included
+            if not self.has_view_or_change_permission(request):
+                raise PermissionDenied
+            return HttpResponse(content)
+        
+        response = super().changelist_view(request, extra_context)
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda r: cache.set(cache_key, r.content, self.changelist_cache_timeout)
+            )
+        return response
+    
+    def has_add_permission(self, request, obj=None):
         return False
 
 
 @admin.register(QualityCheck)
-class QualityCheckAdmin(ImportExportModelAdmin):
+class QualityCheckAdmin(ChangelistDeferMixin, NowInitialMixin, ImportExportModelAdmin):
     list_display = ['check_number', 'work_order', 'inspector', 'check_date', 
                    'result_badge', 'pass_rate_display', 'photo_indicator']
     list_filter = ['result', 'check_date']
     search_fields = ['check_number', 'work_order__wo_number']
+    list_select_related = ('work_order__product', 'inspector')
+    changelist_defer = ('defect_description', 'corrective_action', 'notes')
     autocomplete_fields = ['work_order', 'inspector']
     readonly_fields = ['created_at', 'pass_rate']
     date_hierarchy = 'check_date'
@@ -332,6 +396,8 @@ class QualityCheckAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(QualityCheck.RESULT_CHOICES)
+    
     def result_badge(self, obj):
         colors = {
             'pass': 'green',
@@ -341,7 +407,7 @@ class QualityCheckAdmin(ImportExportModelAdmin):
         color = colors.get(obj.result, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_result_display()
+            color, self._DISPLAY.get(obj.result, obj.result)
         )
     result_badge.short_description = _('Result')
     
@@ -362,29 +428,33 @@ class QualityCheckAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Downtime)
-class DowntimeAdmin(admin.ModelAdmin):
+class DowntimeAdmin(ChangelistDeferMixin, NowInitialMixin, admin.ModelAdmin):
     list_display = ['production_line', 'machine', 'start_time', 'end_time', 
                    'reason_badge', 'duration_display', 'reported_by']
     list_filter = ['reason', 'production_line', 'start_time']
     search_fields = ['production_line__line_code', 'machine__machine_code', 'description']
+    list_select_related = ('production_line', 'machine', 'reported_by')
+    changelist_defer = ('description', 'resolution')
     autocomplete_fields = ['production_line', 'machine', 'work_order', 'reported_by']
     readonly_fields = ['created_at', 'duration_minutes']
     date_hierarchy = 'start_time'
     
+    _DISPLAY = dict(Downtime.REASON_CHOICES)
+    
     def reason_badge(self, obj):
         colors = {
-            'breakdown': 'red',
-            'maintenance': 'blue',
-            'material_shortage': 'orange',
-            'tool_change': 'purple',
-            'quality_issue': 'darkred',
-            'power_outage': 'black',
-            'other': 'gray',
+            Downtime.Reason.BREAKDOWN: 'red',
+            Downtime.Reason.MAINTENANCE: 'blue',
+            Downtime.Reason.MATERIAL_SHORTAGE: 'orange',
+            Downtime.Reason.TOOL_CHANGE: 'purple',
+            Downtime.Reason.QUALITY_ISSUE: 'darkred',
+            Downtime.Reason.POWER_OUTAGE: 'black',
+            Downtime.Reason.OTHER: 'gray',
         }
         color = colors.get(obj.reason, 'gray')
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
-            color, obj.get_reason_display()
+            color, self._DISPLAY.get(obj.reason, obj.reason)
         )
     reason_badge.short_description = _('Reason')
     
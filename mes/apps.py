@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mes"
+
+    def ready(self):
+        # Import signals when app is ready
+        import mes.signals
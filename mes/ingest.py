@@ -0,0 +1,42 @@
+"""
+MES Ingest
+Bulk loading of shop-floor production logs
+"""
+
+from django.db import transaction
+from core.bulk import bulk_insert
+from core.signals import create_logs
+from .models import ProductionLog, WorkOrder
+from .signals import apply_output_totals
+
+
+def flush_production_logs(logs, using='default'):
+    """Insert a batch of unsaved ProductionLogs in one round-trip
+
+    Uses COPY on PostgreSQL and bulk_create elsewhere. Neither fires post_save,
+    so recorded output is rolled into the work orders and the audit LogData
+    entries are written here, in the same transaction. Both leave the logs'
+    primary keys set, so flushing the same batch again (e.g. retrying after a
+    timeout) skips the logs already stored. Returns the number of logs written.
+    """
+    logs = list(logs)
+    stored = [log.pk for log in logs if log.pk is not None]
+    if stored:
+        stored = set(ProductionLog.objects.using(using).filter(pk__in=stored).values_list('pk', flat=True))
+        logs = [log for log in logs if log.pk not in stored]
+    if not logs:
+        return 0
+
+    with transaction.atomic(using=using):
+        bulk_insert(logs, using)
+        apply_output_totals(logs)
+        wo_numbers = dict(
+            WorkOrder.objects.using(using)
+            .filter(pk__in={log.work_order_id for log in logs})
+            .values_list('pk', 'wo_number')
+        )
+        create_logs('create', 'ProductionLog', [
+            (log.pk, f'ProductionLog {wo_numbers[log.work_order_id]} - {log.get_action_type_display()} created')
+            for log in logs
+        ], using)
+    return len(logs)
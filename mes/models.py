@@ -4,6 +4,7 @@ Production Lines, Shifts, Work Orders, Machines, Production Logs, Quality Checks
 """
 
 from django.db import models
+from django.db.models.functions import Cast, Now
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -56,12 +57,13 @@ class Shift(models.Model):
 
 class Machine(models.Model):
     """Machine/Equipment master"""
-    STATUS_CHOICES = [
-        ('operational', _('Operational')),
-        ('maintenance', _('Under Maintenance')),
-        ('breakdown', _('Breakdown')),
-        ('idle', _('Idle')),
-    ]
+    class Status(models.IntegerChoices):
+        OPERATIONAL = 1, _('Operational')
+        MAINTENANCE = 2, _('Under Maintenance')
+        BREAKDOWN = 3, _('Breakdown')
+        IDLE = 4, _('Idle')
+
+    STATUS_CHOICES = Status.choices
 
     machine_code = models.CharField(_("Machine Code"), max_length=100, unique=True)
     name = models.CharField(_("Machine Name"), max_length=200)
@@ -77,7 +79,7 @@ class Machine(models.Model):
     model_number = models.CharField(_("Model Number"), max_length=100, blank=True, null=True)
     serial_number = models.CharField(_("Serial Number"), max_length=100, blank=True, null=True)
     purchase_date = models.DateField(_("Purchase Date"), blank=True, null=True)
-    status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='operational')
+    status = models.SmallIntegerField(_("Status"), choices=Status.choices, default=Status.OPERATIONAL)
     last_maintenance = models.DateField(_("Last Maintenance"), blank=True, null=True)
     next_maintenance = models.DateField(_("Next Maintenance"), blank=True, null=True)
     active = models.BooleanField(_("Active"), default=True)
@@ -88,6 +90,10 @@ class Machine(models.Model):
         verbose_name = _("Machine")
         verbose_name_plural = _("Machines")
         ordering = ['machine_code']
+        indexes = [
+            models.Index(fields=['status', 'active']),
+            models.Index(fields=['next_maintenance']),
+        ]
 
     def __str__(self):
         return f"{self.machine_code} - {self.name}"
@@ -95,14 +101,15 @@ class Machine(models.Model):
 
 class WorkOrder(models.Model):
     """Manufacturing work order"""
-    STATUS_CHOICES = [
-        ('pending', _('Pending')),
-        ('ready', _('Ready to Start')),
-        ('in_progress', _('In Progress')),
-        ('paused', _('Paused')),
-        ('completed', _('Completed')),
-        ('cancelled', _('Cancelled')),
-    ]
+    class Status(models.IntegerChoices):
+        PENDING = 1, _('Pending')
+        READY = 2, _('Ready to Start')
+        IN_PROGRESS = 3, _('In Progress')
+        PAUSED = 4, _('Paused')
+        COMPLETED = 5, _('Completed')
+        CANCELLED = 6, _('Cancelled')
+
+    STATUS_CHOICES = Status.choices
 
     wo_number = models.CharField(_("WO Number"), max_length=100, unique=True)
     sales_order = models.ForeignKey(
@@ -130,11 +137,11 @@ class WorkOrder(models.Model):
     planned_quantity = models.DecimalField(_("Planned Quantity"), max_digits=12, decimal_places=2, validators=[MinValueValidator(0)])
     produced_quantity = models.DecimalField(_("Produced Quantity"), max_digits=12, decimal_places=2, default=0)
     rejected_quantity = models.DecimalField(_("Rejected Quantity"), max_digits=12, decimal_places=2, default=0)
-    planned_start = models.DateTimeField(_("Planned Start"), default=timezone.now)
+    planned_start = models.DateTimeField(_("Planned Start"), db_default=Now())
     planned_end = models.DateTimeField(_("Planned End"), blank=True, null=True)
     actual_start = models.DateTimeField(_("Actual Start"), blank=True, null=True)
     actual_end = models.DateTimeField(_("Actual End"), blank=True, null=True)
-    status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='pending')
+    status = models.SmallIntegerField(_("Status"), choices=Status.choices, default=Status.PENDING)
     priority = models.IntegerField(_("Priority"), default=5, validators=[MinValueValidator(1), MaxValueValidator(10)])
     notes = models.TextField(_("Notes"), blank=True, null=True)
     created_by = models.ForeignKey(
@@ -154,15 +161,50 @@ class WorkOrder(models.Model):
         ordering = ['-priority', '-planned_start']
         indexes = [
             models.Index(fields=['status', '-planned_start']),
+            models.Index(fields=['status', 'priority']),
             models.Index(fields=['production_line', 'status']),
+            models.Index(fields=['planned_start']),
+            models.Index(fields=['-priority', '-planned_start']),
         ]
 
     def __str__(self):
         return f"{self.wo_number} - {self.product.name}"
 
+    @classmethod
+    def with_metrics(cls, queryset=None):
+        """Annotate completion rate and delay flag in SQL for list/report views"""
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.annotate(
+            _completion=models.Case(
+                models.When(
+                    planned_quantity__gt=0,
+                    # Cast through float so SQLite doesn't truncate to integer division
+                    then=Cast(
+                        Cast('produced_quantity', models.FloatField()) * 100
+                        / models.F('planned_quantity'),
+                        models.DecimalField(max_digits=12, decimal_places=2),
+                    ),
+                ),
+                default=models.Value(Decimal(0)),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            _is_delayed=models.Case(
+                models.When(
+                    status__in=[cls.Status.IN_PROGRESS, cls.Status.PENDING], planned_end__lt=Now(),
+                    then=models.Value(True)
+                ),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
     @property
     def completion_rate(self):
         """Calculate completion percentage"""
+        annotated = getattr(self, '_completion', None)
+        if annotated is not None:
+            return annotated
         if self.planned_quantity > 0:
             return (self.produced_quantity / self.planned_quantity) * 100
         return 0
@@ -180,21 +222,25 @@ class WorkOrder(models.Model):
     @property
     def is_delayed(self):
         """Check if work order is delayed"""
-        if self.status in ['in_progress', 'pending'] and self.planned_end:
+        annotated = getattr(self, '_is_delayed', None)
+        if annotated is not None:
+            return annotated
+        if self.status in (self.Status.IN_PROGRESS, self.Status.PENDING) and self.planned_end:
             return timezone.now() > self.planned_end
         return False
 
 
 class ProductionLog(models.Model):
     """Detailed production activity log"""
-    ACTION_TYPES = [
-        ('start', _('Start')),
-        ('stop', _('Stop')),
-        ('pause', _('Pause')),
-        ('resume', _('Resume')),
-        ('record_output', _('Record Output')),
-        ('record_reject', _('Record Reject')),
-    ]
+    class Action(models.IntegerChoices):
+        START = 1, _('Start')
+        STOP = 2, _('Stop')
+        PAUSE = 3, _('Pause')
+        RESUME = 4, _('Resume')
+        RECORD_OUTPUT = 5, _('Record Output')
+        RECORD_REJECT = 6, _('Record Reject')
+
+    ACTION_TYPES = Action.choices
 
     work_order = models.ForeignKey(
         WorkOrder,
@@ -218,8 +264,8 @@ class ProductionLog(models.Model):
         related_name='production_logs',
         verbose_name=_("Shift")
     )
-    action_type = models.CharField(_("Action Type"), max_length=20, choices=ACTION_TYPES)
-    timestamp = models.DateTimeField(_("Timestamp"), default=timezone.now)
+    action_type = models.SmallIntegerField(_("Action Type"), choices=Action.choices)
+    timestamp = models.DateTimeField(_("Timestamp"), db_default=Now())
     quantity = models.DecimalField(_("Quantity"), max_digits=12, decimal_places=2, default=0)
     rejects = models.DecimalField(_("Rejects"), max_digits=12, decimal_places=2, default=0)
     downtime_minutes = models.DecimalField(_("Downtime (minutes)"), max_digits=8, decimal_places=2, default=0)
@@ -232,12 +278,15 @@ class ProductionLog(models.Model):
         verbose_name_plural = _("Production Logs")
         ordering = ['-timestamp']
         indexes = [
+            models.Index(fields=['-timestamp']),
             models.Index(fields=['work_order', '-timestamp']),
             models.Index(fields=['operator', '-timestamp']),
+            models.Index(fields=['shift', '-timestamp']),
+            models.Index(fields=['work_order', 'action_type']),
         ]
 
     def __str__(self):
-        return f"{self.work_order.wo_number} - {self.action_type} at {self.timestamp}"
+        return f"{self.work_order.wo_number} - {self.get_action_type_display()} at {self.timestamp}"
 
 
 class QualityCheck(models.Model):
@@ -263,7 +312,7 @@ class QualityCheck(models.Model):
         related_name='quality_checks',
         verbose_name=_("Inspector")
     )
-    check_date = models.DateTimeField(_("Check Date"), default=timezone.now)
+    check_date = models.DateTimeField(_("Check Date"), db_default=Now())
     sample_size = models.IntegerField(_("Sample Size"), default=1)
     passed = models.IntegerField(_("Passed"), default=0)
     failed = models.IntegerField(_("Failed"), default=0)
@@ -278,6 +327,10 @@ class QualityCheck(models.Model):
         verbose_name = _("Quality Check")
         verbose_name_plural = _("Quality Checks")
         ordering = ['-check_date']
+        indexes = [
+            models.Index(fields=['work_order', '-check_date']),
+            models.Index(fields=['result', '-check_date']),
+        ]
 
     def __str__(self):
         return f"{self.check_number} - {self.result}"
@@ -292,15 +345,16 @@ class QualityCheck(models.Model):
 
 class Downtime(models.Model):
     """Machine/Line downtime tracking"""
-    REASON_CHOICES = [
-        ('breakdown', _('Equipment Breakdown')),
-        ('maintenance', _('Scheduled Maintenance')),
-        ('material_shortage', _('Material Shortage')),
-        ('tool_change', _('Tool Change')),
-        ('quality_issue', _('Quality Issue')),
-        ('power_outage', _('Power Outage')),
-        ('other', _('Other')),
-    ]
+    class Reason(models.IntegerChoices):
+        BREAKDOWN = 1, _('Equipment Breakdown')
+        MAINTENANCE = 2, _('Scheduled Maintenance')
+        MATERIAL_SHORTAGE = 3, _('Material Shortage')
+        TOOL_CHANGE = 4, _('Tool Change')
+        QUALITY_ISSUE = 5, _('Quality Issue')
+        POWER_OUTAGE = 6, _('Power Outage')
+        OTHER = 7, _('Other')
+
+    REASON_CHOICES = Reason.choices
 
     production_line = models.ForeignKey(
         ProductionLine,
@@ -324,9 +378,18 @@ class Downtime(models.Model):
         related_name='downtimes',
         verbose_name=_("Work Order")
     )
-    start_time = models.DateTimeField(_("Start Time"), default=timezone.now)
+    start_time = models.DateTimeField(_("Start Time"), db_default=Now())
     end_time = models.DateTimeField(_("End Time"), blank=True, null=True)
-    reason = models.CharField(_("Reason"), max_length=30, choices=REASON_CHOICES)
+    # Stored by the database for closed incidents, NULL while still open
+    duration = models.GeneratedField(
+        expression=models.ExpressionWrapper(
+            models.F('end_time') - models.F('start_time'), output_field=models.DurationField()
+        ),
+        output_field=models.DurationField(),
+        db_persist=True,
+        verbose_name=_("Duration")
+    )
+    reason = models.SmallIntegerField(_("Reason"), choices=Reason.choices)
     description = models.TextField(_("Description"))
     reported_by = models.ForeignKey(
         'core.Employee',
@@ -343,13 +406,21 @@ class Downtime(models.Model):
         verbose_name = _("Downtime")
         verbose_name_plural = _("Downtimes")
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['-start_time']),
+            models.Index(fields=['production_line', '-start_time']),
+            models.Index(fields=['reason', '-start_time']),
+            models.Index(fields=['reason', 'duration']),
+        ]
 
     def __str__(self):
-        return f"{self.production_line.line_code} - {self.reason}"
+        return f"{self.production_line.line_code} - {self.get_reason_display()}"
 
     @property
     def duration_minutes(self):
         """Calculate downtime duration in minutes"""
         if self.end_time:
-            return (self.end_time - self.start_time).total_seconds() / 60
+            # The stored column is deferred right after save(); don't refetch it
+            duration = self.__dict__.get('duration') or self.end_time - self.start_time
+            return duration.total_seconds() / 60
         return (timezone.now() - self.start_time).total_seconds() / 60
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+MES App Signals
+Keep work order totals in step with recorded production output
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import WorkOrder, ProductionLog
+
+# Log actions that carry output/reject quantities for their work order
+OUTPUT_ACTIONS = (ProductionLog.Action.RECORD_OUTPUT, ProductionLog.Action.RECORD_REJECT)
+
+
+def apply_output_totals(logs):
+    """Add logged output/rejects to their work orders with one F() UPDATE per order"""
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for log in logs:
+        if log.action_type in OUTPUT_ACTIONS:
+            totals[log.work_order_id][0] += log.quantity or 0
+            totals[log.work_order_id][1] += log.rejects or 0
+    
+    now = timezone.now()
+    for work_order_id, (quantity, rejects) in totals.items():
+        WorkOrder.objects.filter(pk=work_order_id).update(
+            produced_quantity=F('produced_quantity') + quantity,
+            rejected_quantity=F('rejected_quantity') + rejects,
+            updated_at=now
+        )
+
+
+@receiver(post_save, sender=ProductionLog)
+def update_work_order_totals(sender, instance, created, raw=False, **kwargs):
+    """Atomically roll a new output/reject log into its work order"""
+    if created and not raw:
+        apply_output_totals([instance])
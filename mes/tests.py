@@ -1,3 +1,24 @@
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+
+class ProductionLogChangelistCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('viewer', is_staff=True)
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_productionlog'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_page_still_checks_permission(self):
+        url = reverse('admin:mes_productionlog_changelist')
+        self.client.force_login(self.user)
+        # The first response sets the CSRF cookie, which is part of the cache key
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.user.user_permissions.clear()
+        self.assertEqual(self.client.get(url).status_code, 403)
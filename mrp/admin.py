@@ -8,64 +8,118 @@ from django.utils.html import format_html
 from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from datetime import timedelta
+from functools import lru_cache
 from .models import (
     Material, BOM, BOMLine, Inventory, StockMovement,
-    PurchaseRequest, ReorderRule, MRPCalculation
+    PurchaseRequest, ReorderRule, MRPCalculation, next_numbers
 )
+from erp.models import PurchaseOrder, PurchaseOrderLine
+from core.admin_mixins import ChangelistDeferMixin, ChangedFieldsSaveMixin, InlineAutocompleteMixin
+from core.signals import create_logs
+from .resources import StockMovementResource
 from import_export.admin import ImportExportModelAdmin
 
 
+# Changelist badges only vary by a handful of (color, text) pairs, so the
+# rendered HTML is memoized instead of rebuilt per row. Pass translated
+# labels as str so each language gets its own cache entry.
+
+@lru_cache(maxsize=None)
+def _badge(color, text, bold=False):
+    return format_html(
+        '<span style="background-color: {}; color: white; padding: 3px 8px; '
+        'border-radius: 3px;{}">{}</span>',
+        color, ' font-weight: bold;' if bold else '', text
+    )
+
+
+@lru_cache(maxsize=1024)
+def _bold(value):
+    return format_html('<b>{}</b>', value)
+
+
+_STOCK_OK = format_html('<span style="color: green;">✓ OK</span>')
+
+
 @admin.register(Material)
 class MaterialAdmin(ImportExportModelAdmin):
-    list_display = ['material_code', 'name', 'material_type', 'unit_cost', 'supplier', 
+    list_display = ['material_code', 'name', 'material_type_display', 'unit_cost', 'supplier', 
                    'lead_time_days', 'stock_level', 'active']
     list_filter = ['material_type', 'active', 'supplier']
     search_fields = ['material_code', 'name']
+    list_select_related = ('supplier',)
     autocomplete_fields = ['product', 'supplier']
     
+    def get_queryset(self, request):
+        # Stock comes from the mv_material_stock summary (LEFT JOIN), not from
+        # aggregating Inventory/ReorderRule for every listed material
+        return super().get_queryset(request).annotate(
+            _stock=F('stock_summary__qty_on_hand'),
+            _low_stock=F('stock_summary__low_stock'),
+        )
+    
     def stock_level(self, obj):
-        inventory = Inventory.objects.filter(material=obj).first()
-        if inventory:
-            color = 'red' if inventory.is_low_stock else 'green'
+        if obj._stock is not None:
+            color = 'red' if obj._low_stock else 'green'
             return format_html(
                 '<span style="color: {}; font-weight: bold;">{}</span>',
-                color, inventory.quantity_on_hand
+                color, obj._stock
             )
         return format_html('<span style="color: gray;">-</span>')
     stock_level.short_description = _('Stock')
+    
+    _DISPLAY = dict(Material.MATERIAL_TYPES)
+    
+    def material_type_display(self, obj):
+        return str(self._DISPLAY.get(obj.material_type, obj.material_type))
+    material_type_display.short_description = _('Material Type')
+    material_type_display.admin_order_field = 'material_type'
 
 
-class BOMLineInline(admin.TabularInline):
+class BOMLineInline(InlineAutocompleteMixin, admin.TabularInline):
     model = BOMLine
     extra = 1
     autocomplete_fields = ['material', 'component']
     fields = ['line_number', 'material', 'component', 'quantity', 'unit', 'scrap_factor']
+    
+    def get_queryset(self, request):
+        # Each inline row prints str(line), which reads its BOM and item
+        return super().get_queryset(request).with_items()
 
 
 @admin.register(BOM)
-class BOMAdmin(ImportExportModelAdmin):
+class BOMAdmin(ChangelistDeferMixin, ImportExportModelAdmin):
     list_display = ['bom_number', 'product', 'version', 'active', 'effective_date', 
                    'line_count', 'total_cost_display']
     list_filter = ['active', 'effective_date']
     search_fields = ['bom_number', 'product__name']
+    # Joins come from BOM.objects.with_related() in get_queryset; an empty
+    # tuple stops the changelist adding its own select_related()
+    list_select_related = ()
+    changelist_defer = ('notes',)
     autocomplete_fields = ['product']
     readonly_fields = ['created_at', 'updated_at', 'total_cost']
     date_hierarchy = 'effective_date'
     inlines = [BOMLineInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related().annotate(_line_count=Count('lines'))
+    
     def line_count(self, obj):
-        count = obj.lines.count()
-        return format_html('<b>{}</b>', count)
+        return _bold(obj._line_count)
     line_count.short_description = _('Lines')
     
     def total_cost_display(self, obj):
-        cost = obj.total_cost
-        return format_html('<span style="font-weight: bold;">${}</span>', cost)
+        return format_html('<span style="font-weight: bold;">${}</span>', obj.total_cost)
     total_cost_display.short_description = _('Total Cost')
 
 
 @admin.register(Inventory)
-class InventoryAdmin(ImportExportModelAdmin):
+class InventoryAdmin(ChangedFieldsSaveMixin, ImportExportModelAdmin):
     list_display = ['item_display', 'warehouse', 'location', 'quantity_on_hand', 
                    'quantity_reserved', 'quantity_available', 'stock_status', 'updated_at']
     list_filter = ['warehouse', 'updated_at']
@@ -73,6 +127,10 @@ class InventoryAdmin(ImportExportModelAdmin):
     autocomplete_fields = ['product', 'material']
     readonly_fields = ['quantity_available', 'updated_at', 'is_low_stock']
     
+    def get_queryset(self, request):
+        # with_low_stock() joins product; the item column also needs material
+        return super().get_queryset(request).with_low_stock().select_related('material')
+    
     fieldsets = (
         (_('Item'), {
             'fields': ('product', 'material')
@@ -95,69 +153,90 @@ class InventoryAdmin(ImportExportModelAdmin):
     
     def stock_status(self, obj):
         if obj.is_low_stock:
-            return format_html(
-                '<span style="background-color: red; color: white; padding: 3px 8px; '
-                'border-radius: 3px; font-weight: bold;">⚠ LOW</span>'
-            )
+            return _badge('red', '⚠ LOW', bold=True)
         elif obj.quantity_available <= 0:
-            return format_html(
-                '<span style="background-color: darkred; color: white; padding: 3px 8px; '
-                'border-radius: 3px; font-weight: bold;">OUT</span>'
-            )
-        return format_html('<span style="color: green;">✓ OK</span>')
+            return _badge('darkred', 'OUT', bold=True)
+        return _STOCK_OK
     stock_status.short_description = _('Status')
     
     actions = ['create_reorder_requests']
     
     def create_reorder_requests(self, request, queryset):
-        count = 0
-        for inventory in queryset.filter(quantity_available__lt=0):
-            # Logic to create purchase request
-            count += 1
-        messages.success(request, _(f'{count} reorder requests created.'))
+        short = list(
+            queryset.filter(quantity_available__lt=0, material__isnull=False)
+            .select_related('material')
+        )
+        employee = request.user.profile.employee if hasattr(request.user, 'profile') else None
+        today = timezone.now().date()
+        numbers = next_numbers(
+            PurchaseRequest.objects, 'pr_number', f'PR-{today.strftime("%Y%m%d")}-', len(short)
+        )
+        prs = [
+            PurchaseRequest(
+                pr_number=number,
+                material=inventory.material,
+                requested_quantity=max(-inventory.quantity_available, inventory.material.min_order_quantity),
+                required_date=today + timedelta(days=inventory.material.lead_time_days),
+                status=PurchaseRequest.Status.DRAFT,
+                requested_by=employee,
+                notes=f'Reorder for {inventory.warehouse}',
+            )
+            for number, inventory in zip(numbers, short)
+        ]
+        # Re-running the action refreshes the open drafts instead of duplicating them
+        with transaction.atomic():
+            count = PurchaseRequest.upsert_drafts(prs)
+        messages.success(request, _(f'{count} reorder requests created or updated.'))
     create_reorder_requests.short_description = _('Create Reorder Requests')
 
 
 @admin.register(StockMovement)
-class StockMovementAdmin(ImportExportModelAdmin):
+class StockMovementAdmin(ChangelistDeferMixin, ChangedFieldsSaveMixin, ImportExportModelAdmin):
+    resource_classes = [StockMovementResource]
     list_display = ['movement_number', 'movement_type_badge', 'item_display', 
                    'quantity', 'from_warehouse', 'to_warehouse', 'movement_date', 'performed_by']
     list_filter = ['movement_type', 'movement_date', 'from_warehouse', 'to_warehouse']
     search_fields = ['movement_number', 'product__name', 'material__name', 'reference']
+    # Joins come from StockMovement.objects.with_refs() in get_queryset
+    list_select_related = ()
+    changelist_defer = ('notes',)
     autocomplete_fields = ['product', 'material', 'work_order', 'purchase_order', 
                           'sales_order', 'performed_by']
     readonly_fields = ['created_at']
     date_hierarchy = 'movement_date'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_refs()
+    
     def item_display(self, obj):
         item = obj.product or obj.material
         return str(item)
     item_display.short_description = _('Item')
     
+    _DISPLAY = dict(StockMovement.MOVEMENT_TYPES)
+    
     def movement_type_badge(self, obj):
         colors = {
-            'in': 'green',
-            'out': 'red',
-            'transfer': 'blue',
-            'adjustment': 'orange',
-            'production': 'purple',
-            'consumption': 'darkred',
+            StockMovement.MovementType.IN: 'green',
+            StockMovement.MovementType.OUT: 'red',
+            StockMovement.MovementType.TRANSFER: 'blue',
+            StockMovement.MovementType.ADJUSTMENT: 'orange',
+            StockMovement.MovementType.PRODUCTION: 'purple',
+            StockMovement.MovementType.CONSUMPTION: 'darkred',
         }
-        color = colors.get(obj.movement_type, 'gray')
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 8px; '
-            'border-radius: 3px;">{}</span>',
-            color, obj.get_movement_type_display()
-        )
+        label = str(self._DISPLAY.get(obj.movement_type, obj.movement_type))
+        return _badge(colors.get(obj.movement_type, 'gray'), label)
     movement_type_badge.short_description = _('Type')
 
 
 @admin.register(PurchaseRequest)
-class PurchaseRequestAdmin(ImportExportModelAdmin):
+class PurchaseRequestAdmin(ChangelistDeferMixin, ImportExportModelAdmin):
     list_display = ['pr_number', 'material', 'requested_quantity', 'required_date', 
                    'status_badge', 'purchase_order', 'requested_by']
     list_filter = ['status', 'required_date', 'created_at']
     search_fields = ['pr_number', 'material__name']
+    list_select_related = ('material', 'purchase_order__supplier', 'requested_by')
+    changelist_defer = ('notes',)
     autocomplete_fields = ['material', 'purchase_order', 'work_order', 'requested_by']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'required_date'
@@ -178,42 +257,110 @@ class PurchaseRequestAdmin(ImportExportModelAdmin):
         }),
     )
     
+    _DISPLAY = dict(PurchaseRequest.STATUS_CHOICES)
+    
     def status_badge(self, obj):
         colors = {
-            'draft': 'gray',
-            'pending': 'blue',
-            'approved': 'green',
-            'ordered': 'purple',
-            'received': 'darkgreen',
-            'cancelled': 'red',
+            PurchaseRequest.Status.DRAFT: 'gray',
+            PurchaseRequest.Status.PENDING: 'blue',
+            PurchaseRequest.Status.APPROVED: 'green',
+            PurchaseRequest.Status.ORDERED: 'purple',
+            PurchaseRequest.Status.RECEIVED: 'darkgreen',
+            PurchaseRequest.Status.CANCELLED: 'red',
         }
-        color = colors.get(obj.status, 'gray')
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 8px; '
-            'border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
-        )
+        label = str(self._DISPLAY.get(obj.status, obj.status))
+        return _badge(colors.get(obj.status, 'gray'), label)
     status_badge.short_description = _('Status')
     
     actions = ['approve_requests', 'create_purchase_orders']
     
     def approve_requests(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='approved')
+        updated = queryset.filter(status=PurchaseRequest.Status.PENDING).update(
+            status=PurchaseRequest.Status.APPROVED, updated_at=timezone.now()
+        )
         messages.success(request, _(f'{updated} requests approved.'))
     approve_requests.short_description = _('Approve Selected Requests')
     
     def create_purchase_orders(self, request, queryset):
-        # Will create POs from approved PRs
-        messages.info(request, _('PO creation from PRs will be implemented.'))
+        """One draft PO per supplier for the approved requests, created set-wise"""
+        approved = queryset.filter(
+            status=PurchaseRequest.Status.APPROVED, material__supplier__isnull=False
+        ).select_related('material__supplier')
+        by_supplier = {}
+        skipped = 0
+        for pr in approved:
+            # PO lines need a product, so requests for unlinked materials stay approved
+            if pr.material.product_id is None:
+                skipped += 1
+                continue
+            by_supplier.setdefault(pr.material.supplier_id, []).append(pr)
+        if skipped:
+            messages.warning(request, _(
+                f'{skipped} requests skipped: their material is not linked to a product.'
+            ))
+        if not by_supplier:
+            messages.warning(request, _('No approved requests with a supplier selected.'))
+            return
+        
+        employee = request.user.profile.employee if hasattr(request.user, 'profile') else None
+        today = timezone.now().date()
+        numbers = next_numbers(
+            PurchaseOrder.objects, 'po_number', f'PO-{today.strftime("%Y%m")}-', len(by_supplier)
+        )
+        orders = []
+        lines = []
+        for number, (supplier_id, prs) in zip(numbers, by_supplier.items()):
+            po = PurchaseOrder(
+                po_number=number,
+                supplier_id=supplier_id,
+                order_date=today,
+                expected_date=max(pr.required_date for pr in prs),
+                status='draft',
+                created_by=employee,
+            )
+            po_lines = [
+                PurchaseOrderLine(
+                    purchase_order=po,
+                    product_id=pr.material.product_id,
+                    quantity=pr.requested_quantity,
+                    unit_price=pr.material.unit_cost,
+                    total_price=pr.requested_quantity * pr.material.unit_cost,
+                )
+                for pr in prs
+            ]
+            po.total_amount = sum(line.total_price for line in po_lines)
+            orders.append(po)
+            lines.extend(po_lines)
+        
+        with transaction.atomic():
+            PurchaseOrder.objects.bulk_create(orders)
+            PurchaseOrderLine.objects.bulk_create(lines)
+            now = timezone.now()
+            for po, prs in zip(orders, by_supplier.values()):
+                PurchaseRequest.objects.filter(pk__in=[pr.pk for pr in prs]).update(
+                    status=PurchaseRequest.Status.ORDERED, purchase_order=po, updated_at=now
+                )
+            # bulk_create and update() skip the post_save audit
+            create_logs('create', 'PurchaseOrder', [
+                (po.pk, f'PurchaseOrder {po.po_number} - {prs[0].material.supplier.name} created')
+                for po, prs in zip(orders, by_supplier.values())
+            ])
+            create_logs('update', 'PurchaseRequest', [
+                (pr.pk, f'PurchaseRequest {pr} updated')
+                for prs in by_supplier.values() for pr in prs
+            ])
+        
+        messages.success(request, _(f'{len(orders)} purchase orders created.'))
     create_purchase_orders.short_description = _('Create Purchase Orders')
 
 
 @admin.register(ReorderRule)
 class ReorderRuleAdmin(ImportExportModelAdmin):
-    list_display = ['item_display', 'warehouse', 'rule_type', 'reorder_point', 
+    list_display = ['item_display', 'warehouse', 'rule_type_display', 'reorder_point', 
                    'reorder_quantity', 'active', 'last_triggered']
     list_filter = ['rule_type', 'active', 'warehouse']
     search_fields = ['product__name', 'material__name', 'warehouse']
+    list_select_related = ('product', 'material')
     autocomplete_fields = ['product', 'material']
     readonly_fields = ['created_at', 'updated_at', 'last_triggered']
     
@@ -221,34 +368,43 @@ class ReorderRuleAdmin(ImportExportModelAdmin):
         item = obj.product or obj.material
         return str(item)
     item_display.short_description = _('Item')
+    
+    def rule_type_display(self, obj):
+        # Labels come from the model's own lookup table, shared with __str__
+        return str(obj._DISPLAY.get(obj.rule_type, obj.rule_type))
+    rule_type_display.short_description = _('Rule Type')
+    rule_type_display.admin_order_field = 'rule_type'
 
 
 @admin.register(MRPCalculation)
-class MRPCalculationAdmin(admin.ModelAdmin):
+class MRPCalculationAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     list_display = ['calculation_number', 'start_time', 'end_time', 'status_badge', 
                    'work_orders_analyzed', 'purchase_requests_created', 'run_by']
     list_filter = ['status', 'start_time']
     search_fields = ['calculation_number']
+    list_select_related = ('run_by',)
+    changelist_defer = ('calculation_log',)
     autocomplete_fields = ['run_by']
     readonly_fields = ['created_at', 'start_time', 'end_time', 'work_orders_analyzed', 
-                      'purchase_requests_created', 'calculation_log']
+                      'purchase_requests_created', 'log_display']
+    exclude = ['calculation_log']
     date_hierarchy = 'start_time'
     
     def status_badge(self, obj):
         colors = {
-            'running': 'blue',
-            'completed': 'green',
-            'failed': 'red',
+            MRPCalculation.Status.RUNNING: 'blue',
+            MRPCalculation.Status.COMPLETED: 'green',
+            MRPCalculation.Status.FAILED: 'red',
         }
-        color = colors.get(obj.status, 'gray')
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 8px; '
-            'border-radius: 3px;">{}</span>',
-            color, obj.get_status_display()
-        )
+        label = str(obj._DISPLAY.get(obj.status, obj.status))
+        return _badge(colors.get(obj.status, 'gray'), label)
     status_badge.short_description = _('Status')
     
-    def has_add_permission(self, request):
+    def log_display(self, obj):
+        return format_html('<pre>{}</pre>', '\n'.join(obj.iter_log()))
+    log_display.short_description = _('Calculation Log')
+    
+    def has_add_permission(self, request, obj=None):
         return False
     
     def has_change_permission(self, request, obj=None):
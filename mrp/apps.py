@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MrpConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mrp"
+
+    def ready(self):
+        # Import signals when app is ready
+        import mrp.signals
+        post_migrate.connect(mrp.signals.create_materialized_views, sender=self)
+        post_migrate.connect(mrp.signals.create_postgres_indexes, sender=self)
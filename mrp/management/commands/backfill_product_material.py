@@ -0,0 +1,38 @@
+"""
+Management command to backfill Product.material_code / material_unit_cost
+Usage: python manage.py backfill_product_material
+
+The mrp signals keep the copies in step on every Material save; run this once
+after adding the columns (or after loading data with signals off) to fill them
+for existing rows. Safe to re-run.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import OuterRef, Subquery
+
+from erp.models import Product
+from mrp.models import Material
+
+
+class Command(BaseCommand):
+    help = 'Copy each linked material\'s code and unit cost onto its product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        products = Product.objects.using(using)
+        linked = Material.objects.using(using).filter(product=OuterRef('pk'))
+        with transaction.atomic(using=using):
+            copied = products.filter(material_detail__isnull=False).update(
+                material_code=Subquery(linked.values('material_code')[:1]),
+                material_unit_cost=Subquery(linked.values('unit_cost')[:1]),
+            )
+            cleared = products.filter(material_detail__isnull=True, material_code__isnull=False).update(
+                material_code=None, material_unit_cost=None
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{copied} products updated from their material, {cleared} stale copies cleared.'
+        ))
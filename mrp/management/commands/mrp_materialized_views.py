@@ -0,0 +1,42 @@
+"""
+Management command to rebuild or refresh the MRP read-side views
+Usage: python manage.py mrp_materialized_views [--refresh] [--view mv_material_stock]
+
+Without --refresh the views are dropped and recreated (as after migrate).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from mrp.matviews import MATERIALIZED_VIEWS, create_views, refresh_view
+
+
+class Command(BaseCommand):
+    help = 'Recreate or refresh the MRP materialized views'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help='Refresh the views in place instead of recreating them'
+        )
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Only refresh this view (repeatable); defaults to all of them'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not options['refresh']:
+            create_views(using)
+            self.stdout.write(self.style.SUCCESS(f'{len(MATERIALIZED_VIEWS)} views recreated.'))
+            return
+
+        views = options['views'] or list(MATERIALIZED_VIEWS)
+        unknown = set(views) - set(MATERIALIZED_VIEWS)
+        if unknown:
+            raise CommandError(f'Unknown view(s): {", ".join(sorted(unknown))}')
+        for name in views:
+            refresh_view(name, using)
+            self.stdout.write(f'  refreshed {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(views)} views refreshed.'))
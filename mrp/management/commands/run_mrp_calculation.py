@@ -0,0 +1,34 @@
+"""
+Management command to run an MRP calculation
+Usage: python manage.py run_mrp_calculation [--employee EMP001]
+
+See mrp.utils.MRPCalculator. The run and its log are listed under MRP
+Calculations in the admin.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Employee
+from mrp.utils import MRPCalculator
+
+
+class Command(BaseCommand):
+    help = 'Explode open work orders and create draft purchase requests for short materials'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employee', help='Employee ID recorded as the run owner and requester')
+
+    def handle(self, *args, **options):
+        employee = None
+        if options['employee']:
+            employee = Employee.objects.filter(employee_id=options['employee']).first()
+            if employee is None:
+                raise CommandError(f'Unknown employee: {options["employee"]}')
+
+        success, calculation = MRPCalculator(run_by=employee).run_calculation()
+        if not success:
+            raise CommandError(f'{calculation.calculation_number} failed, see its log.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{calculation.calculation_number}: {calculation.work_orders_analyzed} work orders analyzed, '
+            f'{calculation.purchase_requests_created} purchase requests created or updated.'
+        ))
@@ -0,0 +1,99 @@
+"""
+MRP Materialized Views
+Read-side summaries backing the unmanaged models in mrp.models.
+
+On PostgreSQL each view is a MATERIALIZED VIEW with a unique index so it can be
+refreshed CONCURRENTLY; on other backends (SQLite in development) it is a plain
+VIEW, which is always current and never needs refreshing.
+
+Refreshes scheduled inside batched_refreshes() (every request, via
+MatviewRefreshMiddleware, and bulk commands such as seed_data) run once per view
+when the block ends; elsewhere each one runs after the transaction commits.
+"""
+
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import connections, transaction
+
+
+# name -> (SELECT statement, unique key column)
+MATERIALIZED_VIEWS = {
+    'mv_material_stock': (
+        """
+        SELECT i.material_id AS material_id,
+               SUM(i.quantity_on_hand) AS qty_on_hand,
+               SUM(i.quantity_reserved) AS qty_reserved,
+               MAX(CASE WHEN i.quantity_on_hand <= r.reorder_point THEN 1 ELSE 0 END) = 1 AS low_stock
+        FROM mrp_inventory i
+        LEFT JOIN mrp_reorderrule r
+               ON r.material_id = i.material_id
+              AND r.warehouse = i.warehouse
+              AND r.active
+        WHERE i.material_id IS NOT NULL
+        GROUP BY i.material_id
+        """,
+        'material_id',
+    ),
+}
+
+
+def _is_postgres(connection):
+    return connection.vendor == 'postgresql'
+
+
+def create_views(using='default'):
+    """(Re)create every view; called from post_migrate"""
+    connection = connections[using]
+    materialized = _is_postgres(connection)
+    kind = 'MATERIALIZED VIEW' if materialized else 'VIEW'
+    with connection.cursor() as cursor:
+        for name, (select, key) in MATERIALIZED_VIEWS.items():
+            cursor.execute(f'DROP {kind} IF EXISTS {name}')
+            cursor.execute(f'CREATE {kind} {name} AS {select}')
+            if materialized:
+                cursor.execute(f'CREATE UNIQUE INDEX {name}_key ON {name} ({key})')
+
+
+def refresh_view(name, using='default'):
+    """Refresh a materialized view without blocking readers"""
+    connection = connections[using]
+    if not _is_postgres(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {name}')
+
+
+# Views waiting for the end of the current batched_refreshes() block
+_batch = threading.local()
+
+
+@contextmanager
+def batched_refreshes():
+    """Hold back refreshes scheduled inside the block and run each view's once at the end
+
+    Nested blocks join the outermost one. Nothing is refreshed if the block raises.
+    """
+    if getattr(_batch, 'pending', None) is not None:
+        yield
+        return
+    _batch.pending = set()
+    try:
+        yield
+        pending = _batch.pending
+    finally:
+        _batch.pending = None
+    for name, using in sorted(pending):
+        refresh_view(name, using)
+
+
+def schedule_refresh(name, using='default'):
+    """Refresh a view at the end of the current batch, or after the transaction commits"""
+    if not _is_postgres(connections[using]):
+        return
+    pending = getattr(_batch, 'pending', None)
+    if pending is not None:
+        pending.add((name, using))
+    else:
+        transaction.on_commit(partial(refresh_view, name, using), using=using)
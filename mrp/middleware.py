@@ -0,0 +1,16 @@
+"""
+MRP Middleware
+Request-wide batching of materialized view refreshes
+"""
+
+from .matviews import batched_refreshes
+
+
+class MatviewRefreshMiddleware:
+    """Refresh each materialized view a request touched once, after its view has run"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with batched_refreshes():
+            return self.get_response(request)
@@ -3,25 +3,39 @@ MRP App Models
 Materials, BOM, Inventory, Stock Movements, Purchase Requests, Reorder Rules
 """
 
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import Coalesce, Round
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.validators import MinValueValidator
+from collections import defaultdict
 from decimal import Decimal
+from core.bulk import bulk_insert
+from core.signals import create_logs
+from .matviews import schedule_refresh
+
+
+def next_numbers(queryset, field, prefix, count):
+    """Reserve `count` sequential document numbers after the highest `prefix`NNN in use"""
+    last = (queryset.filter(**{f'{field}__startswith': prefix})
+            .order_by(f'-{field}').values_list(field, flat=True).first())
+    start = int(last[len(prefix):]) + 1 if last and last[len(prefix):].isdigit() else 1
+    return [f'{prefix}{str(n).zfill(3)}' for n in range(start, start + count)]
 
 
 class Material(models.Model):
     """Material master data (extends Product for raw materials)"""
-    MATERIAL_TYPES = [
-        ('raw', _('Raw Material')),
-        ('component', _('Component')),
-        ('consumable', _('Consumable')),
-        ('packaging', _('Packaging')),
-    ]
+    class MaterialType(models.IntegerChoices):
+        RAW = 1, _('Raw Material')
+        COMPONENT = 2, _('Component')
+        CONSUMABLE = 3, _('Consumable')
+        PACKAGING = 4, _('Packaging')
+
+    MATERIAL_TYPES = MaterialType.choices
 
     material_code = models.CharField(_("Material Code"), max_length=100, unique=True)
     name = models.CharField(_("Material Name"), max_length=300)
-    material_type = models.CharField(_("Material Type"), max_length=20, choices=MATERIAL_TYPES, default='raw')
+    material_type = models.SmallIntegerField(_("Material Type"), choices=MaterialType.choices, default=MaterialType.RAW)
     product = models.OneToOneField(
         'erp.Product',
         on_delete=models.SET_NULL,
@@ -55,6 +69,12 @@ class Material(models.Model):
         return f"{self.material_code} - {self.name}"
 
 
+class BOMQuerySet(models.QuerySet):
+    def with_related(self):
+        """BOMs with the product their __str__ shows"""
+        return self.select_related('product')
+
+
 class BOM(models.Model):
     """Bill of Materials - product composition"""
     bom_number = models.CharField(_("BOM Number"), max_length=100, unique=True)
@@ -68,28 +88,96 @@ class BOM(models.Model):
     active = models.BooleanField(_("Active"), default=True)
     effective_date = models.DateField(_("Effective Date"), default=timezone.now)
     notes = models.TextField(_("Notes"), blank=True, null=True)
+    # The one stored BOM cost, maintained by mrp.signals whenever lines or
+    # their unit costs change. Kept at full line precision (quantity 4dp x cost
+    # 2dp) so per-line deltas add up exactly; total_cost rounds it for display
+    total_cost_cached = models.DecimalField(
+        _("Total Cost"), max_digits=18, decimal_places=6, default=0, editable=False
+    )
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
 
+    objects = BOMQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("BOM")
         verbose_name_plural = _("BOMs")
         ordering = ['bom_number']
         unique_together = ['product', 'version']
+        constraints = [
+            # explode() sums every active BOM of a product, so a second active
+            # version would double its requirements. Also indexes the lookup
+            models.UniqueConstraint(
+                fields=['product'], condition=models.Q(active=True), name='mrp_bom_active_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.bom_number} - {self.product.name} v{self.version}"
 
     @property
     def total_cost(self):
-        """Calculate total material cost for this BOM"""
-        total = Decimal(0)
-        for line in self.lines.all():
-            if line.material:
-                total += line.quantity * line.material.unit_cost
-            elif line.component:
-                total += line.quantity * line.component.cost
-        return total
+        """Total material cost for this BOM, to the cent"""
+        return Decimal(self.total_cost_cached).quantize(Decimal('0.01'))
+
+    @staticmethod
+    def _line_cost(prefix=''):
+        """quantity x material unit cost, or x component cost for sub-assembly lines"""
+        return models.Case(
+            models.When(**{f'{prefix}material__isnull': False},
+                        then=models.F(f'{prefix}quantity') * models.F(f'{prefix}material__unit_cost')),
+            default=models.F(f'{prefix}quantity') * models.F(f'{prefix}component__cost'),
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        )
+
+    @classmethod
+    def explode(cls, demand):
+        """Gross requirements for {product_id: quantity} from each product's active BOM
+
+        One level deep, scrap included. Lines are streamed as plain tuples, not
+        BOMLine instances, since a run covers every line of every demanded
+        product. Returns ({material_id: qty}, {component_product_id: qty}).
+        """
+        materials, components = defaultdict(Decimal), defaultdict(Decimal)
+        lines = (BOMLine.objects.filter(bom__active=True, bom__product__in=list(demand))
+                 .order_by()
+                 .values_list('bom__product', 'material', 'component', 'adjusted_quantity')
+                 .iterator(chunk_size=2000))
+        for product_id, material_id, component_id, quantity in lines:
+            needed = quantity * demand[product_id]
+            if material_id is not None:
+                materials[material_id] += needed
+            elif component_id is not None:
+                components[component_id] += needed
+        return dict(materials), dict(components)
+
+    @staticmethod
+    def rounded_cost(expression):
+        """Round a cost expression to total_cost_cached's 6 places
+
+        SQLite does decimal arithmetic in floating point; rounding every write
+        keeps its binary noise from piling up in the stored total.
+        """
+        return Round(expression, 6, output_field=BOM._meta.get_field('total_cost_cached'))
+
+    @classmethod
+    def refresh_total_cost(cls, boms):
+        """Recompute total_cost_cached for the given BOMs (queryset or ids) in one UPDATE
+
+        Single line edits apply a delta instead (mrp.signals); use this after
+        bulk loads and unit cost changes.
+        """
+        totals = (BOMLine.objects.filter(bom=models.OuterRef('pk'))
+                  .values('bom').annotate(total=models.Sum(cls._line_cost())).values('total'))
+        return cls.objects.filter(pk__in=boms).update(
+            total_cost_cached=cls.rounded_cost(Coalesce(models.Subquery(totals), Decimal(0)))
+        )
+
+
+class BOMLineQuerySet(models.QuerySet):
+    def with_items(self):
+        """Lines with their material/component and BOM, as __str__ reads them"""
+        return self.select_related('material', 'component', 'bom__product')
 
 
 class BOMLine(models.Model):
@@ -126,7 +214,21 @@ class BOMLine(models.Model):
         default=0,
         help_text=_("Expected waste percentage")
     )
+    # Quantity including scrap factor, stored by the database so MRP explosion
+    # can read it without recomputing per line. Multiplied rather than divided
+    # by 100: SQLite would integer-divide whole-number scrap factors
+    adjusted_quantity = models.GeneratedField(
+        expression=models.F('quantity') * (1 + models.F('scrap_factor') * models.Value(Decimal('0.01'))),
+        output_field=models.DecimalField(max_digits=14, decimal_places=4),
+        db_persist=True,
+        verbose_name=_("Adjusted Quantity")
+    )
     notes = models.TextField(_("Notes"), blank=True, null=True)
+    # str(line) written on save (and on BOM/item renames, see mrp.signals) so
+    # listings and pickers print lines without fetching the BOM and item
+    display_name = models.CharField(_("Display Name"), max_length=600, blank=True, editable=False)
+
+    objects = BOMLineQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("BOM Line")
@@ -135,13 +237,42 @@ class BOMLine(models.Model):
         unique_together = ['bom', 'line_number']
 
     def __str__(self):
+        return self.display_name or self._display_name()
+
+    def _display_name(self):
         item = self.material or self.component
         return f"{self.bom.bom_number} - Line {self.line_number}: {item}"
 
-    @property
-    def adjusted_quantity(self):
-        """Quantity including scrap factor"""
-        return self.quantity * (1 + self.scrap_factor / 100)
+    def save(self, *args, **kwargs):
+        self.display_name = self._display_name()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'bom', 'line_number', 'material', 'component'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'display_name'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def refresh_display_names(cls, lines):
+        """Rewrite display_name for the given lines (queryset) where it went stale"""
+        stale = []
+        for line in lines.with_items():
+            name = line._display_name()
+            if line.display_name != name:
+                line.display_name = name
+                stale.append(line)
+        return cls.objects.bulk_update(stale, ['display_name'], batch_size=1000)
+
+
+class InventoryQuerySet(models.QuerySet):
+    def with_low_stock(self):
+        """Annotate the is_low_stock flag in SQL (read back through the property)"""
+        return self.select_related('product').annotate(
+            _is_low_stock=models.Case(
+                models.When(product__min_stock__gt=0,
+                            quantity_available__lt=models.F('product__min_stock'), then=True),
+                default=False,
+                output_field=models.BooleanField(),
+            )
+        )
 
 
 class Inventory(models.Model):
@@ -166,14 +297,35 @@ class Inventory(models.Model):
     location = models.CharField(_("Location"), max_length=200, blank=True, null=True)
     quantity_on_hand = models.DecimalField(_("Quantity On Hand"), max_digits=15, decimal_places=2, default=0)
     quantity_reserved = models.DecimalField(_("Quantity Reserved"), max_digits=15, decimal_places=2, default=0)
-    quantity_available = models.DecimalField(_("Quantity Available"), max_digits=15, decimal_places=2, default=0)
+    # Computed and stored by the database, so bulk/raw updates of the two
+    # source columns can't leave it stale
+    quantity_available = models.GeneratedField(
+        expression=models.F('quantity_on_hand') - models.F('quantity_reserved'),
+        output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        db_persist=True,
+        verbose_name=_("Quantity Available")
+    )
     last_count_date = models.DateField(_("Last Count Date"), blank=True, null=True)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
 
+    objects = InventoryQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Inventory")
         verbose_name_plural = _("Inventory")
-        unique_together = ['product', 'material', 'warehouse', 'location']
+        # One unique index per item kind. A single (product, material, ...)
+        # key never matched anything: NULLs are distinct in unique indexes and
+        # every row has one of the two FKs (and often location) NULL
+        constraints = [
+            models.UniqueConstraint(
+                'product', 'warehouse', Coalesce('location', models.Value('')),
+                condition=models.Q(material__isnull=True), name='mrp_inventory_product_uniq'
+            ),
+            models.UniqueConstraint(
+                'material', 'warehouse', Coalesce('location', models.Value('')),
+                condition=models.Q(product__isnull=True), name='mrp_inventory_material_uniq'
+            ),
+        ]
         indexes = [
             models.Index(fields=['warehouse']),
             models.Index(fields=['quantity_on_hand']),
@@ -183,32 +335,117 @@ class Inventory(models.Model):
         item = self.product or self.material
         return f"{item} - {self.warehouse}: {self.quantity_on_hand}"
 
-    def save(self, *args, **kwargs):
-        """Auto-calculate available quantity"""
-        self.quantity_available = self.quantity_on_hand - self.quantity_reserved
-        super().save(*args, **kwargs)
-
     @property
     def is_low_stock(self):
         """Check if stock is below minimum level"""
+        if hasattr(self, '_is_low_stock'):
+            return self._is_low_stock
         if self.product and self.product.min_stock:
             return self.quantity_available < self.product.min_stock
         return False
 
+    @classmethod
+    def apply_movements(cls, movements, using='default', batch_size=1000):
+        """Post stock movements to quantity_on_hand with one UPDATE ... FROM (VALUES ...)
+
+        Each movement takes its quantity out of from_warehouse and puts it into
+        to_warehouse. Deltas are summed per item and warehouse and land on that
+        item's first inventory row there (movements carry no bin location);
+        rows that don't exist yet are created. Returns the rows touched. Writes
+        the audit entries post_save would have.
+        """
+        deltas = defaultdict(Decimal)
+        for movement in movements:
+            item = (movement.product_id, movement.material_id)
+            if movement.from_warehouse:
+                deltas[item + (movement.from_warehouse,)] -= movement.quantity
+            if movement.to_warehouse:
+                deltas[item + (movement.to_warehouse,)] += movement.quantity
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+
+        with transaction.atomic(using=using):
+            rows = (cls.objects.using(using)
+                    .filter(models.Q(product__in={p for p, _, _ in deltas if p}) |
+                            models.Q(material__in={m for _, m, _ in deltas if m}),
+                            warehouse__in={w for _, _, w in deltas})
+                    .order_by().values_list('product', 'material', 'warehouse')
+                    .annotate(first=models.Min('id')))
+            existing = {(p, m, w): pk for p, m, w, pk in rows}
+
+            created = cls.objects.using(using).bulk_create([
+                cls(product_id=p, material_id=m, warehouse=w, quantity_on_hand=delta)
+                for (p, m, w), delta in deltas.items() if (p, m, w) not in existing
+            ], batch_size=batch_size)
+
+            updates = [(existing[key], delta) for key, delta in deltas.items() if key in existing]
+            table = connections[using].ops.quote_name(cls._meta.db_table)
+            with connections[using].cursor() as cursor:
+                for start in range(0, len(updates), batch_size):
+                    batch = updates[start:start + batch_size]
+                    values = ', '.join(['(%s, %s)'] * len(batch))
+                    cursor.execute(
+                        f'UPDATE {table} SET quantity_on_hand = quantity_on_hand + d.column2, '
+                        f'updated_at = %s FROM (VALUES {values}) AS d WHERE {table}.id = d.column1',
+                        [timezone.now()] + [value for row in batch for value in row]
+                    )
+            create_logs('create', 'Inventory', [
+                (row.pk, f'Inventory {row.warehouse}: {row.quantity_on_hand} created') for row in created
+            ], using)
+            create_logs('update', 'Inventory', [
+                (existing[(p, m, w)], f'Inventory {w}: {delta:+} on hand updated')
+                for (p, m, w), delta in deltas.items() if (p, m, w) in existing
+            ], using)
+            schedule_refresh('mv_material_stock', using)
+        return len(deltas)
+
+
+class MaterialStock(models.Model):
+    """Per-material stock summary (database view, see mrp.matviews)"""
+    material = models.OneToOneField(
+        Material,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='stock_summary',
+        verbose_name=_("Material")
+    )
+    qty_on_hand = models.DecimalField(_("Quantity On Hand"), max_digits=15, decimal_places=2)
+    qty_reserved = models.DecimalField(_("Quantity Reserved"), max_digits=15, decimal_places=2)
+    low_stock = models.BooleanField(_("Low Stock"))
+
+    class Meta:
+        managed = False
+        db_table = 'mv_material_stock'
+        verbose_name = _("Material Stock")
+        verbose_name_plural = _("Material Stock")
+
+    def __str__(self):
+        return f"{self.material_id}: {self.qty_on_hand}"
+
+
+class StockMovementQuerySet(models.QuerySet):
+    def with_refs(self):
+        """Movements with every referenced item, document and employee joined in"""
+        return self.select_related(
+            'product', 'material', 'work_order', 'purchase_order', 'sales_order', 'performed_by'
+        )
+
 
 class StockMovement(models.Model):
     """Stock movement transactions"""
-    MOVEMENT_TYPES = [
-        ('in', _('Inbound')),
-        ('out', _('Outbound')),
-        ('transfer', _('Transfer')),
-        ('adjustment', _('Adjustment')),
-        ('production', _('Production')),
-        ('consumption', _('Consumption')),
-    ]
+    class MovementType(models.IntegerChoices):
+        IN = 1, _('Inbound')
+        OUT = 2, _('Outbound')
+        TRANSFER = 3, _('Transfer')
+        ADJUSTMENT = 4, _('Adjustment')
+        PRODUCTION = 5, _('Production')
+        CONSUMPTION = 6, _('Consumption')
+
+    MOVEMENT_TYPES = MovementType.choices
 
     movement_number = models.CharField(_("Movement Number"), max_length=100, unique=True)
-    movement_type = models.CharField(_("Movement Type"), max_length=20, choices=MOVEMENT_TYPES)
+    movement_type = models.SmallIntegerField(_("Movement Type"), choices=MovementType.choices)
     product = models.ForeignKey(
         'erp.Product',
         on_delete=models.PROTECT,
@@ -266,6 +503,8 @@ class StockMovement(models.Model):
     notes = models.TextField(_("Notes"), blank=True, null=True)
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
 
+    objects = StockMovementQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Stock Movement")
         verbose_name_plural = _("Stock Movements")
@@ -273,23 +512,49 @@ class StockMovement(models.Model):
         indexes = [
             models.Index(fields=['-movement_date']),
             models.Index(fields=['movement_type', '-movement_date']),
+            models.Index(fields=['from_warehouse', '-movement_date']),
+            models.Index(fields=['to_warehouse', '-movement_date']),
         ]
 
     def __str__(self):
         item = self.product or self.material
         return f"{self.movement_number} - {item}: {self.quantity}"
 
+    @classmethod
+    def bulk_log(cls, movements, using='default'):
+        """Insert a batch of unsaved movements in one round-trip (COPY on PostgreSQL)
+
+        post_save doesn't fire, so the audit entries it would have written and
+        the stock summary refresh it would have queued happen here. Returns the
+        number of movements written.
+        """
+        with transaction.atomic(using=using):
+            count = bulk_insert(movements, using)
+            if count:
+                create_logs('create', 'StockMovement', [
+                    (movement.pk, f'StockMovement {movement.movement_number} created')
+                    for movement in movements
+                ], using)
+                schedule_refresh('mv_material_stock', using)
+        return count
+
+
+# Module level so PurchaseRequest.Meta can name the members (a nested class
+# can't see its enclosing class's namespace); use it as PurchaseRequest.Status
+class PurchaseRequestStatus(models.IntegerChoices):
+    DRAFT = 1, _('Draft')
+    PENDING = 2, _('Pending Approval')
+    APPROVED = 3, _('Approved')
+    ORDERED = 4, _('PO Created')
+    RECEIVED = 5, _('Received')
+    CANCELLED = 6, _('Cancelled')
+
 
 class PurchaseRequest(models.Model):
     """Material purchase request (MRP generated)"""
-    STATUS_CHOICES = [
-        ('draft', _('Draft')),
-        ('pending', _('Pending Approval')),
-        ('approved', _('Approved')),
-        ('ordered', _('PO Created')),
-        ('received', _('Received')),
-        ('cancelled', _('Cancelled')),
-    ]
+    Status = PurchaseRequestStatus
+
+    STATUS_CHOICES = Status.choices
 
     pr_number = models.CharField(_("PR Number"), max_length=100, unique=True)
     material = models.ForeignKey(
@@ -300,7 +565,7 @@ class PurchaseRequest(models.Model):
     )
     requested_quantity = models.DecimalField(_("Requested Quantity"), max_digits=12, decimal_places=2)
     required_date = models.DateField(_("Required Date"))
-    status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='draft')
+    status = models.SmallIntegerField(_("Status"), choices=Status.choices, default=Status.DRAFT)
     purchase_order = models.ForeignKey(
         'erp.PurchaseOrder',
         on_delete=models.SET_NULL,
@@ -333,10 +598,93 @@ class PurchaseRequest(models.Model):
         verbose_name = _("Purchase Request")
         verbose_name_plural = _("Purchase Requests")
         ordering = ['-required_date', '-pr_number']
+        indexes = [
+            # Open requests only - received / cancelled ones are history
+            models.Index(
+                fields=['required_date', 'material'],
+                condition=~models.Q(status__in=[PurchaseRequestStatus.RECEIVED, PurchaseRequestStatus.CANCELLED]),
+                name='mrp_pr_open_idx'
+            ),
+        ]
+        constraints = [
+            # At most one draft per material and date: repeat MRP/reorder runs
+            # update it in place, see upsert_drafts()
+            models.UniqueConstraint(
+                fields=['material', 'required_date'], condition=models.Q(status=PurchaseRequestStatus.DRAFT),
+                name='mrp_pr_draft_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.pr_number} - {self.material.name}"
 
+    @classmethod
+    def upsert_drafts(cls, requests, using='default', batch_size=1000):
+        """Insert draft requests, or update the existing draft's quantity, in one statement
+
+        INSERT ... ON CONFLICT against mrp_pr_draft_uniq. bulk_create() can't
+        name a partial index as the conflict target, hence the SQL. Requests
+        for the same material and date are summed first. Returns the number of
+        rows inserted or updated; pr_numbers of merged requests go unused.
+        Writes the audit entries post_save would have.
+        """
+        merged = {}
+        for request in requests:
+            key = (request.material_id, request.required_date)
+            if key in merged:
+                merged[key].requested_quantity += request.requested_quantity
+            else:
+                merged[key] = request
+        if not merged:
+            return 0
+
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        fields = [field for field in cls._meta.concrete_fields if not field.primary_key]
+        rows = []
+        for request in merged.values():
+            request.status = cls.Status.DRAFT
+            rows.append([
+                field.get_db_prep_save(field.pre_save(request, add=True), connection)
+                for field in fields
+            ])
+        columns = ', '.join(quote(field.column) for field in fields)
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        count = 0
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            # Drafts the INSERT will update rather than create, for the audit log
+            existing = {
+                (material_id, required_date): (pk, pr_number)
+                for material_id, required_date, pk, pr_number in cls.objects.using(using).filter(
+                    status=cls.Status.DRAFT,
+                    material__in={material_id for material_id, _ in merged},
+                    required_date__in={required_date for _, required_date in merged},
+                ).values_list('material', 'required_date', 'pk', 'pr_number')
+                if (material_id, required_date) in merged
+            }
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f'INSERT INTO {quote(cls._meta.db_table)} ({columns}) '
+                    f'VALUES {", ".join([placeholders] * len(batch))} '
+                    f'ON CONFLICT (material_id, required_date) WHERE status = {cls.Status.DRAFT:d} '
+                    f'DO UPDATE SET requested_quantity = EXCLUDED.requested_quantity, '
+                    f'updated_at = EXCLUDED.updated_at',
+                    [value for row in batch for value in row]
+                )
+                count += cursor.rowcount
+
+            created = cls.objects.using(using).filter(pr_number__in=[
+                request.pr_number for key, request in merged.items() if key not in existing
+            ]).values_list('pk', 'pr_number')
+            create_logs('create', 'PurchaseRequest', [
+                (pk, f'PurchaseRequest {pr_number} created') for pk, pr_number in created
+            ], using)
+            create_logs('update', 'PurchaseRequest', [
+                (pk, f'PurchaseRequest {pr_number} updated') for pk, pr_number in existing.values()
+            ], using)
+        return count
+
 
 class ReorderRule(models.Model):
     """Automatic reorder point rules"""
@@ -345,6 +693,9 @@ class ReorderRule(models.Model):
         ('reorder_point', _('Reorder Point')),
         ('time_based', _('Time Based')),
     ]
+    # Labels by value for __str__ and listings; get_rule_type_display() scans
+    # the choices on every call
+    _DISPLAY = dict(RULE_TYPES)
 
     product = models.ForeignKey(
         'erp.Product',
@@ -377,24 +728,34 @@ class ReorderRule(models.Model):
         verbose_name = _("Reorder Rule")
         verbose_name_plural = _("Reorder Rules")
         unique_together = ['product', 'material', 'warehouse']
+        indexes = [
+            # Matches the active-rule join in mv_material_stock; INCLUDE lets
+            # PostgreSQL answer it from the index alone
+            models.Index(
+                fields=['material', 'warehouse'], condition=models.Q(active=True),
+                include=['reorder_point', 'reorder_quantity'], name='mrp_reorder_active_idx'
+            ),
+        ]
 
     def __str__(self):
         item = self.product or self.material
-        return f"{item} - {self.warehouse} - {self.get_rule_type_display()}"
+        return f"{item} - {self.warehouse} - {self._DISPLAY.get(self.rule_type, self.rule_type)}"
 
 
 class MRPCalculation(models.Model):
     """MRP calculation run history"""
-    STATUS_CHOICES = [
-        ('running', _('Running')),
-        ('completed', _('Completed')),
-        ('failed', _('Failed')),
-    ]
+    class Status(models.IntegerChoices):
+        RUNNING = 1, _('Running')
+        COMPLETED = 2, _('Completed')
+        FAILED = 3, _('Failed')
+
+    STATUS_CHOICES = Status.choices
+    _DISPLAY = dict(STATUS_CHOICES)
 
     calculation_number = models.CharField(_("Calculation Number"), max_length=100, unique=True)
     start_time = models.DateTimeField(_("Start Time"), default=timezone.now)
     end_time = models.DateTimeField(_("End Time"), blank=True, null=True)
-    status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='running')
+    status = models.SmallIntegerField(_("Status"), choices=Status.choices, default=Status.RUNNING)
     work_orders_analyzed = models.IntegerField(_("Work Orders Analyzed"), default=0)
     purchase_requests_created = models.IntegerField(_("Purchase Requests Created"), default=0)
     calculation_log = models.TextField(_("Calculation Log"), blank=True, null=True)
@@ -414,4 +775,51 @@ class MRPCalculation(models.Model):
         ordering = ['-start_time']
 
     def __str__(self):
-        return f"{self.calculation_number} - {self.status}"
\ No newline at end of file
+        return f"{self.calculation_number} - {self._DISPLAY.get(self.status, self.status)}"
+
+    def add_log(self, *messages):
+        """Append lines to the run log as new rows; earlier lines are never rewritten
+
+        Callers should collect a run's lines and append them in one call. The
+        calculation row is locked while the next seq is read, so concurrent
+        appends queue up instead of colliding on (calculation, seq).
+        """
+        if not messages:
+            return
+        with transaction.atomic():
+            MRPCalculation.objects.select_for_update().filter(pk=self.pk).values_list('pk').get()
+            last = self.logs.aggregate(last=models.Max('seq'))['last'] or 0
+            now = timezone.now()
+            MRPCalculationLogEntry.objects.bulk_create([
+                MRPCalculationLogEntry(calculation=self, seq=last + n, timestamp=now, message=message)
+                for n, message in enumerate(messages, 1)
+            ], batch_size=500)
+
+    def iter_log(self):
+        """Log lines in order, streamed from the database in chunks"""
+        if self.calculation_log:
+            # Runs recorded before log entries existed
+            yield from self.calculation_log.splitlines()
+        yield from self.logs.values_list('message', flat=True).iterator(chunk_size=2000)
+
+
+class MRPCalculationLogEntry(models.Model):
+    """One line of an MRP calculation run log"""
+    calculation = models.ForeignKey(
+        MRPCalculation,
+        on_delete=models.CASCADE,
+        related_name='logs',
+        verbose_name=_("MRP Calculation")
+    )
+    seq = models.PositiveIntegerField(_("Sequence"))
+    timestamp = models.DateTimeField(_("Timestamp"), default=timezone.now)
+    message = models.TextField(_("Message"))
+
+    class Meta:
+        verbose_name = _("MRP Calculation Log Entry")
+        verbose_name_plural = _("MRP Calculation Log Entries")
+        ordering = ['seq']
+        unique_together = ['calculation', 'seq']
+
+    def __str__(self):
+        return f"{self.calculation_id} #{self.seq}: {self.message}"
\ No newline at end of file
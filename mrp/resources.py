@@ -0,0 +1,81 @@
+"""
+MRP Import/Export Resources
+"""
+
+import functools
+
+from import_export import resources, widgets
+from import_export.instance_loaders import CachedInstanceLoader
+from .models import StockMovement
+from .matviews import schedule_refresh
+
+
+class CachedForeignKeyWidget(widgets.ForeignKeyWidget):
+    """ForeignKeyWidget that fetches each referenced row once per import"""
+    def __init__(self, model, field='pk', **kwargs):
+        super().__init__(model, field, **kwargs)
+        self._instances = {}
+
+    def get_instance_by_lookup_fields(self, value, row, **kwargs):
+        if value not in self._instances:
+            self._instances[value] = super().get_instance_by_lookup_fields(value, row, **kwargs)
+        return self._instances[value]
+
+
+class StockMovementResource(resources.ModelResource):
+    """Bulk import of stock movements
+
+    Rows are written with bulk_create/bulk_update in batches instead of one
+    save() per row; existing movements and referenced products/materials are
+    looked up once rather than per row. Bulk writes skip post_save, so the
+    stock summary is refreshed once after the import.
+
+    Imports of more than LARGE_IMPORT_ROWS rows write their new movements
+    through StockMovement.bulk_log() instead: COPY on PostgreSQL, which beats
+    even a raw executemany of INSERTs, plus the audit entries.
+    """
+    LARGE_IMPORT_ROWS = 10_000
+
+    class Meta:
+        model = StockMovement
+        exclude = ('id',)
+        import_id_fields = ('movement_number',)
+        instance_loader_class = CachedInstanceLoader
+        use_bulk = True
+        batch_size = 1000
+        skip_diff = True
+
+    @classmethod
+    def get_fk_widget(cls, field):
+        widget = super().get_fk_widget(field)
+        return functools.partial(CachedForeignKeyWidget, *widget.args, **widget.keywords)
+
+    def before_import(self, dataset, **kwargs):
+        super().before_import(dataset, **kwargs)
+        self._large_import = len(dataset) > self.LARGE_IMPORT_ROWS
+
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        if not getattr(self, '_large_import', False):
+            return super().bulk_create(using_transactions, dry_run, raise_errors, batch_size, result)
+        if self.create_instances and (using_transactions or not dry_run):
+            try:
+                StockMovement.bulk_log(self.create_instances)
+            except Exception as e:
+                self.handle_import_error(result, e, raise_errors)
+            finally:
+                self.create_instances.clear()
+
+    def import_instance(self, instance, row, **kwargs):
+        super().import_instance(instance, row, **kwargs)
+        # FKs are assigned by id; attach the rows the widgets already loaded so
+        # str(instance) in the import report doesn't fetch them again
+        for field in self.get_import_fields():
+            if isinstance(field.widget, CachedForeignKeyWidget) and field.attribute.endswith('_id'):
+                related = field.widget._instances.get(row.get(field.column_name))
+                if related is not None:
+                    setattr(instance, field.attribute[:-3], related)
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if not kwargs.get('dry_run') and result.totals['new'] + result.totals['update']:
+            schedule_refresh('mv_material_stock')
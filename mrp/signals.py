@@ -0,0 +1,172 @@
+"""
+MRP App Signals
+Keep materialized stock summaries and cached BOM costs in step with changes
+"""
+
+from decimal import Decimal
+from django.db import connections
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from erp.models import Product
+from .models import Material, BOM, BOMLine, Inventory, StockMovement
+from .matviews import create_views, schedule_refresh
+
+
+# PostgreSQL-only indexes; SQLite (the default backend) can't build them, so
+# they stay out of Meta.indexes
+POSTGRES_INDEXES = [
+    # Movements arrive in date order: a BRIN index serves date-range scans at a
+    # fraction of the btree's size. The -movement_date btree stays for the
+    # ordered changelist.
+    'CREATE INDEX IF NOT EXISTS mrp_stockmovement_date_brin ON mrp_stockmovement '
+    'USING brin (movement_date) WITH (pages_per_range = 32)',
+]
+
+
+def create_materialized_views(sender, using='default', **kwargs):
+    """post_migrate hook - views aren't tracked by migrations"""
+    create_views(using)
+
+
+def create_postgres_indexes(sender, using='default', **kwargs):
+    """post_migrate hook - add the POSTGRES_INDEXES when running on PostgreSQL"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for sql in POSTGRES_INDEXES:
+            cursor.execute(sql)
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_save, sender=StockMovement)
+def refresh_material_stock(sender, instance, using='default', raw=False, **kwargs):
+    """Refresh the material stock summary when inventory or stock moves
+
+    Fixture loads (raw) are skipped; refresh with mrp_materialized_views --refresh.
+    """
+    if instance.material_id and not raw:
+        schedule_refresh('mv_material_stock', using)
+
+
+def _line_cost(pk):
+    return BOMLine.objects.filter(pk=pk).annotate(cost=BOM._line_cost()).values('cost')
+
+
+@receiver(pre_save, sender=BOMLine)
+def remember_line_cost(sender, instance, raw=False, **kwargs):
+    """Note the stored line's BOM and cost so post_save only applies the difference"""
+    instance._stored_cost = None
+    if not raw and instance.pk:
+        instance._stored_cost = _line_cost(instance.pk).values_list('bom', 'cost').first()
+
+
+@receiver(post_save, sender=BOMLine)
+def apply_line_cost_delta(sender, instance, raw=False, **kwargs):
+    """Add (new - old) line cost to the BOM's cached total with one F() UPDATE"""
+    if raw:
+        return
+    old_bom, old_cost = getattr(instance, '_stored_cost', None) or (instance.bom_id, None)
+    old_cost = old_cost or Decimal(0)
+    if old_bom != instance.bom_id:
+        # Line moved to another BOM: take it off the old one entirely
+        BOM.objects.filter(pk=old_bom).update(
+            total_cost_cached=BOM.rounded_cost(F('total_cost_cached') - old_cost)
+        )
+        old_cost = Decimal(0)
+    new_cost = Coalesce(Subquery(_line_cost(instance.pk)), Decimal(0))
+    BOM.objects.filter(pk=instance.bom_id).update(
+        total_cost_cached=BOM.rounded_cost(F('total_cost_cached') + new_cost - old_cost)
+    )
+
+
+@receiver(pre_delete, sender=BOMLine)
+def remove_line_cost(sender, instance, **kwargs):
+    """Subtract a deleted line's cost while its row (and cost inputs) still exist"""
+    line_cost = Coalesce(Subquery(_line_cost(instance.pk)), Decimal(0))
+    BOM.objects.filter(pk=instance.bom_id).update(
+        total_cost_cached=BOM.rounded_cost(F('total_cost_cached') - line_cost)
+    )
+
+
+# Stored values read before a Material/Product/BOM save, so post_save handlers
+# only rewrite costs, copies and display names when their inputs changed
+_WATCHED_FIELDS = {
+    Material: ['product_id', 'unit_cost', 'material_code', 'name'],
+    Product: ['cost', 'product_number', 'name'],
+    BOM: ['bom_number'],
+}
+
+
+@receiver(pre_save, sender=Material)
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=BOM)
+def remember_stored_fields(sender, instance, raw=False, **kwargs):
+    instance._stored_fields = None
+    if not raw and instance.pk:
+        instance._stored_fields = (
+            sender.objects.filter(pk=instance.pk).values(*_WATCHED_FIELDS[sender]).first()
+        )
+
+
+def _changed(instance, *fields):
+    """Whether any of `fields` differs from the stored row (False for new rows)"""
+    stored = getattr(instance, '_stored_fields', None)
+    if stored is None:
+        return False
+    opts = instance._meta
+    return any(
+        opts.get_field(name).to_python(getattr(instance, name)) != stored[name] for name in fields
+    )
+
+
+@receiver(post_save, sender=Material)
+def copy_material_to_product(sender, instance, created, raw=False, **kwargs):
+    """Keep Product.material_code/material_unit_cost in step with the linked material"""
+    if raw or not (created or _changed(instance, 'product_id', 'material_code', 'unit_cost')):
+        return
+    stored = (instance._stored_fields or {}).get('product_id')
+    if stored and stored != instance.product_id:
+        Product.objects.filter(pk=stored).update(material_code=None, material_unit_cost=None)
+    if instance.product_id:
+        Product.objects.filter(pk=instance.product_id).update(
+            material_code=instance.material_code, material_unit_cost=instance.unit_cost
+        )
+
+
+@receiver(post_delete, sender=Material)
+def clear_product_material_copy(sender, instance, **kwargs):
+    if instance.product_id:
+        Product.objects.filter(pk=instance.product_id).update(material_code=None, material_unit_cost=None)
+
+
+@receiver(post_save, sender=Material)
+def refresh_material_bom_costs(sender, instance, raw=False, **kwargs):
+    """A material's unit cost feeds every BOM that uses it, its code and name the lines' labels"""
+    if raw:
+        return
+    if _changed(instance, 'unit_cost'):
+        BOM.refresh_total_cost(BOMLine.objects.filter(material=instance).values('bom'))
+    if _changed(instance, 'material_code', 'name'):
+        BOMLine.refresh_display_names(BOMLine.objects.filter(material=instance))
+
+
+@receiver(post_save, sender=Product)
+def refresh_component_bom_costs(sender, instance, raw=False, **kwargs):
+    """Same for products used as BOM components"""
+    if raw:
+        return
+    if _changed(instance, 'cost'):
+        BOM.refresh_total_cost(BOMLine.objects.filter(component=instance).values('bom'))
+    if _changed(instance, 'product_number', 'name'):
+        BOMLine.refresh_display_names(BOMLine.objects.filter(component=instance))
+
+
+@receiver(post_save, sender=BOM)
+def refresh_bom_line_names(sender, instance, raw=False, **kwargs):
+    """Lines print their BOM number"""
+    if not raw and _changed(instance, 'bom_number'):
+        BOMLine.refresh_display_names(instance.lines.all())
@@ -1,3 +1,361 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from tablib import Dataset
+
+from core.models import LogData
+from erp.models import Product
+from mes.models import WorkOrder
+from .models import (
+    BOM, BOMLine, Inventory, Material, MaterialStock, MRPCalculation, PurchaseRequest, StockMovement
+)
+from .resources import StockMovementResource
+
+
+class StockMovementBulkLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.material = Material.objects.create(material_code='MAT-T1', name='Steel Sheet')
+
+    def movement(self, number, **kwargs):
+        kwargs.setdefault('quantity', Decimal('1.50'))
+        return StockMovement(
+            movement_number=number, movement_type=StockMovement.MovementType.CONSUMPTION,
+            material=self.material, from_warehouse='Main', unit='kg', **kwargs
+        )
+
+    def test_writes_rows_and_sets_primary_keys(self):
+        movements = [self.movement(f'SM-T-{i}', quantity=Decimal(i)) for i in range(1, 4)]
+        self.assertEqual(StockMovement.bulk_log(movements), 3)
+
+        stored = StockMovement.objects.filter(movement_number__startswith='SM-T-')
+        self.assertEqual(
+            sorted(stored.values_list('movement_number', 'quantity')),
+            [('SM-T-1', Decimal('1.00')), ('SM-T-2', Decimal('2.00')), ('SM-T-3', Decimal('3.00'))]
+        )
+        self.assertEqual({m.pk for m in movements}, set(stored.values_list('pk', flat=True)))
+        self.assertFalse(stored.filter(created_at__isnull=True).exists())
+
+    def test_empty_batch(self):
+        self.assertEqual(StockMovement.bulk_log([]), 0)
+
+    def test_writes_audit_entries(self):
+        movements = [self.movement(f'SM-LOG-{i}') for i in range(2)]
+        StockMovement.bulk_log(movements)
+        entries = LogData.objects.filter(model_name='StockMovement')
+        self.assertEqual(
+            sorted(entries.values_list('action_type', 'object_id', 'description')),
+            sorted(('create', m.pk, f'StockMovement {m.movement_number} created') for m in movements)
+        )
+
+    def test_duplicate_movement_number_rolls_back_batch(self):
+        self.movement('SM-DUP').save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StockMovement.bulk_log([self.movement('SM-NEW'), self.movement('SM-DUP')])
+        self.assertFalse(StockMovement.objects.filter(movement_number='SM-NEW').exists())
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY path is PostgreSQL only')
+    def test_copy_draws_ids_from_table_sequence(self):
+        movements = [self.movement(f'SM-SEQ-{i}') for i in range(3)]
+        StockMovement.bulk_log(movements)
+        later = self.movement('SM-SEQ-LATER')
+        later.save()
+        self.assertGreater(later.pk, max(m.pk for m in movements))
+
+
+class StockMovementResourceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.material = Material.objects.create(material_code='MAT-T1', name='Steel Sheet')
+
+    def dataset(self, count):
+        dataset = Dataset(
+            headers=['movement_number', 'movement_type', 'material', 'quantity', 'to_warehouse']
+        )
+        for i in range(count):
+            dataset.append([f'SM-IMP-{i}', StockMovement.MovementType.IN, self.material.pk, '2.5', 'Main'])
+        return dataset
+
+    def import_rows(self, count):
+        result = StockMovementResource().import_data(self.dataset(count), raise_errors=True)
+        self.assertEqual(result.totals['new'], count)
+        self.assertEqual(StockMovement.objects.filter(movement_number__startswith='SM-IMP-').count(), count)
+
+    def test_small_import_uses_bulk_create(self):
+        with mock.patch.object(StockMovement, 'bulk_log') as bulk_log:
+            self.import_rows(3)
+        bulk_log.assert_not_called()
+
+    @mock.patch.object(StockMovementResource, 'LARGE_IMPORT_ROWS', 2)
+    def test_large_import_goes_through_bulk_log(self):
+        self.import_rows(3)
+        self.assertEqual(LogData.objects.filter(model_name='StockMovement', action_type='create').count(), 3)
+
+
+class InventoryApplyMovementsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.steel = Material.objects.create(material_code='MAT-T1', name='Steel Sheet')
+        cls.resin = Material.objects.create(material_code='MAT-T2', name='Plastic Resin')
+        cls.main = Inventory.objects.create(material=cls.steel, warehouse='Main', quantity_on_hand=10)
+        # A second bin in the same warehouse; deltas land on the first row
+        cls.main_bin = Inventory.objects.create(
+            material=cls.steel, warehouse='Main', location='B2', quantity_on_hand=5
+        )
+
+    def movement(self, material, quantity, from_warehouse=None, to_warehouse=None):
+        return StockMovement(
+            material=material, quantity=Decimal(quantity),
+            from_warehouse=from_warehouse, to_warehouse=to_warehouse
+        )
+
+    def on_hand(self, material, warehouse):
+        return list(
+            Inventory.objects.filter(material=material, warehouse=warehouse)
+            .order_by('id').values_list('quantity_on_hand', flat=True)
+        )
+
+    def test_transfer_updates_source_and_creates_destination(self):
+        touched = Inventory.apply_movements([self.movement(self.steel, '4', 'Main', 'Annex')])
+        self.assertEqual(touched, 2)
+        self.assertEqual(self.on_hand(self.steel, 'Main'), [Decimal('6.00'), Decimal('5.00')])
+        self.assertEqual(self.on_hand(self.steel, 'Annex'), [Decimal('4.00')])
+
+    def test_deltas_are_summed_per_item_and_warehouse(self):
+        touched = Inventory.apply_movements([
+            self.movement(self.steel, '3', to_warehouse='Main'),
+            self.movement(self.steel, '1.5', from_warehouse='Main'),
+            self.movement(self.resin, '7', to_warehouse='Main'),
+            self.movement(self.resin, '2', to_warehouse='Main'),
+        ], batch_size=1)
+        self.assertEqual(touched, 2)
+        self.assertEqual(self.on_hand(self.steel, 'Main'), [Decimal('11.50'), Decimal('5.00')])
+        self.assertEqual(self.on_hand(self.resin, 'Main'), [Decimal('9.00')])
+
+    def test_writes_audit_entries(self):
+        last = LogData.objects.order_by('-pk').values_list('pk', flat=True).first()
+        Inventory.apply_movements([self.movement(self.steel, '4', 'Main', 'Annex')])
+        annex = Inventory.objects.get(material=self.steel, warehouse='Annex')
+        self.assertEqual(
+            sorted(LogData.objects.filter(model_name='Inventory', pk__gt=last)
+                   .values_list('action_type', 'object_id', 'description')),
+            [('create', annex.pk, 'Inventory Annex: 4 created'),
+             ('update', self.main.pk, 'Inventory Main: -4 on hand updated')]
+        )
+
+    def test_movements_that_cancel_out_touch_nothing(self):
+        touched = Inventory.apply_movements([
+            self.movement(self.steel, '2', to_warehouse='Main'),
+            self.movement(self.steel, '2', from_warehouse='Main'),
+        ])
+        self.assertEqual(touched, 0)
+        self.assertEqual(self.on_hand(self.steel, 'Main'), [Decimal('10.00'), Decimal('5.00')])
+
+    def test_material_stock_summary_follows(self):
+        # A materialized view on PostgreSQL, refreshed once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Inventory.apply_movements([self.movement(self.steel, '5', to_warehouse='Main')])
+        self.assertEqual(MaterialStock.objects.get(material=self.steel).qty_on_hand, Decimal('20.00'))
+
+
+class PurchaseRequestUpsertDraftsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.material = Material.objects.create(material_code='MAT-T1', name='Steel Sheet')
+        cls.day = date(2030, 1, 15)
+
+    def request(self, number, quantity, required_date=None):
+        return PurchaseRequest(
+            pr_number=number, material=self.material, requested_quantity=Decimal(quantity),
+            required_date=required_date or self.day
+        )
+
+    def drafts(self):
+        return list(
+            PurchaseRequest.objects.filter(status=PurchaseRequest.Status.DRAFT)
+            .order_by('required_date').values_list('pr_number', 'required_date', 'requested_quantity')
+        )
+
+    def test_inserts_new_drafts(self):
+        later = date(2030, 1, 20)
+        count = PurchaseRequest.upsert_drafts([self.request('PR-1', '5'), self.request('PR-2', '8', later)])
+        self.assertEqual(count, 2)
+        self.assertEqual(self.drafts(), [('PR-1', self.day, Decimal('5.00')), ('PR-2', later, Decimal('8.00'))])
+
+    def test_updates_existing_draft_in_place(self):
+        PurchaseRequest.upsert_drafts([self.request('PR-1', '5')])
+        count = PurchaseRequest.upsert_drafts([self.request('PR-9', '12')])
+        self.assertEqual(count, 1)
+        self.assertEqual(self.drafts(), [('PR-1', self.day, Decimal('12.00'))])
+
+    def test_merges_requests_for_same_material_and_date(self):
+        count = PurchaseRequest.upsert_drafts([self.request('PR-1', '5'), self.request('PR-2', '2.5')])
+        self.assertEqual(count, 1)
+        self.assertEqual(self.drafts(), [('PR-1', self.day, Decimal('7.50'))])
+
+    def test_leaves_non_draft_requests_alone(self):
+        approved = self.request('PR-1', '5')
+        approved.status = PurchaseRequest.Status.APPROVED
+        approved.save()
+        PurchaseRequest.upsert_drafts([self.request('PR-2', '3')], batch_size=1)
+        approved.refresh_from_db()
+        self.assertEqual(approved.requested_quantity, Decimal('5.00'))
+        self.assertEqual(self.drafts(), [('PR-2', self.day, Decimal('3.00'))])
+
+    def test_empty_batch(self):
+        self.assertEqual(PurchaseRequest.upsert_drafts([]), 0)
+
+    def test_writes_audit_entries(self):
+        PurchaseRequest.upsert_drafts([self.request('PR-1', '5')])
+        PurchaseRequest.upsert_drafts([self.request('PR-9', '12'), self.request('PR-10', '1', date(2030, 2, 1))])
+        ids = dict(PurchaseRequest.objects.values_list('pr_number', 'pk'))
+        self.assertEqual(
+            list(LogData.objects.filter(model_name='PurchaseRequest').order_by('pk')
+                 .values_list('action_type', 'object_id', 'description')),
+            [('create', ids['PR-1'], 'PurchaseRequest PR-1 created'),
+             ('create', ids['PR-10'], 'PurchaseRequest PR-10 created'),
+             ('update', ids['PR-1'], 'PurchaseRequest PR-1 updated')]
+        )
+
+
+class BOMCostTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.steel = Material.objects.create(material_code='MAT-T1', name='Steel Sheet', unit_cost=Decimal('1.10'))
+        cls.bracket = Product.objects.create(product_number='PRD-T1', name='Bracket', cost=Decimal('2.35'))
+        cls.frame = Product.objects.create(product_number='PRD-T2', name='Frame')
+        cls.bom = BOM.objects.create(bom_number='BOM-T1', product=cls.frame)
+        BOMLine.objects.create(bom=cls.bom, line_number=1, material=cls.steel, quantity=Decimal('3.3333'))
+        BOMLine.objects.create(bom=cls.bom, line_number=2, component=cls.bracket, quantity=Decimal('2'))
+
+    def total(self):
+        self.bom.refresh_from_db()
+        return self.bom.total_cost_cached
+
+    def test_line_edits_keep_exact_total(self):
+        self.assertEqual(self.total(), Decimal('8.366630'))
+        self.assertEqual(self.bom.total_cost, Decimal('8.37'))
+
+        line = self.bom.lines.get(line_number=1)
+        line.quantity = Decimal('0.0001')
+        line.save()
+        self.assertEqual(self.total(), Decimal('4.700110'))
+
+        line.delete()
+        self.assertEqual(self.total(), Decimal('4.700000'))
+
+    def test_unit_cost_changes_refresh_total(self):
+        self.steel.unit_cost = Decimal('2.00')
+        self.steel.save()
+        self.bracket.cost = Decimal('1.00')
+        self.bracket.save()
+        self.assertEqual(self.total(), Decimal('8.666600'))
+
+    def test_renames_refresh_line_names(self):
+        self.steel.name = 'Aluminium Sheet'
+        self.steel.save()
+        self.assertEqual(
+            self.bom.lines.get(line_number=1).display_name, 'BOM-T1 - Line 1: MAT-T1 - Aluminium Sheet'
+        )
+
+    def test_unrelated_saves_leave_boms_alone(self):
+        self.steel.lead_time_days = 14
+        self.bracket.description = 'Zinc plated'
+        with CaptureQueriesContext(connection) as queries:
+            self.steel.save()
+            self.bracket.save()
+        self.assertFalse([q for q in queries if 'mrp_bom' in q['sql']])
+
+
+class MRPRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.steel = Material.objects.create(material_code='MAT-T1', name='Steel Sheet', min_order_quantity=1)
+        cls.resin = Material.objects.create(
+            material_code='MAT-T2', name='Plastic Resin', min_order_quantity=Decimal('500'), lead_time_days=3
+        )
+        cls.frame = Product.objects.create(product_number='PRD-T1', name='Frame')
+        cls.bracket = Product.objects.create(product_number='PRD-T2', name='Bracket')
+        frame_bom = BOM.objects.create(bom_number='BOM-T1', product=cls.frame)
+        BOMLine.objects.create(bom=frame_bom, line_number=1, material=cls.steel, quantity=2, scrap_factor=10)
+        BOMLine.objects.create(bom=frame_bom, line_number=2, component=cls.bracket, quantity=4)
+        bracket_bom = BOM.objects.create(bom_number='BOM-T2', product=cls.bracket)
+        BOMLine.objects.create(bom=bracket_bom, line_number=1, material=cls.steel, quantity=Decimal('0.5'))
+        BOMLine.objects.create(bom=bracket_bom, line_number=2, material=cls.resin, quantity=1)
+        Inventory.objects.create(material=cls.steel, warehouse='Main', quantity_on_hand=30)
+        WorkOrder.objects.create(wo_number='WO-T1', product=cls.frame, planned_quantity=15, produced_quantity=5)
+        WorkOrder.objects.create(
+            wo_number='WO-T2', product=cls.frame, planned_quantity=50, status=WorkOrder.Status.COMPLETED
+        )
+
+    def run_mrp(self):
+        call_command('run_mrp_calculation', stdout=StringIO())
+        return MRPCalculation.objects.latest('start_time')
+
+    def drafts(self):
+        return dict(
+            PurchaseRequest.objects.filter(status=PurchaseRequest.Status.DRAFT)
+            .values_list('material__material_code', 'requested_quantity')
+        )
+
+    def test_explodes_sub_assemblies_and_nets_stock(self):
+        calculation = self.run_mrp()
+        # steel: 10 x 2 x 1.1 + 10 x 4 x 0.5 = 42, less 30 on hand; resin: 40, raised to the minimum
+        self.assertEqual(self.drafts(), {'MAT-T1': Decimal('12.00'), 'MAT-T2': Decimal('500.00')})
+        self.assertEqual(calculation.status, MRPCalculation.Status.COMPLETED)
+        self.assertEqual(calculation.work_orders_analyzed, 1)
+        self.assertEqual(calculation.purchase_requests_created, 2)
+        log = list(calculation.iter_log())
+        self.assertEqual(log[:3], [
+            '1 open work orders for 1 products',
+            'Level 1: 1 materials, 1 sub-assemblies',
+            'Level 2: 2 materials, 0 sub-assemblies',
+        ])
+        self.assertIn('MAT-T1: need 42.00, short 12.00, request 12.00', log)
+
+    def test_only_the_active_bom_version_counts(self):
+        draft = BOM.objects.create(bom_number='BOM-T1-2', product=self.frame, version='2.0', active=False)
+        BOMLine.objects.create(bom=draft, line_number=1, material=self.steel, quantity=100)
+        self.run_mrp()
+        self.assertEqual(self.drafts(), {'MAT-T1': Decimal('12.00'), 'MAT-T2': Decimal('500.00')})
+        # A product can't have two active versions, so explode() never sums both
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BOM.objects.filter(pk=draft.pk).update(active=True)
+
+    def test_log_is_written_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            calculation = self.run_mrp()
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "mrp_mrpcalculationlogentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(calculation.logs.count(), 5)
+
+    def test_rerun_updates_drafts_and_counts_pending_requests(self):
+        self.run_mrp()
+        PurchaseRequest.objects.filter(material=self.steel).update(status=PurchaseRequest.Status.PENDING)
+        self.run_mrp()
+        self.assertEqual(self.drafts(), {'MAT-T2': Decimal('500.00')})
+        self.assertEqual(PurchaseRequest.objects.count(), 2)
+
+
+class MRPCalculationLogTests(TestCase):
+    def test_add_log_appends_after_earlier_entries(self):
+        calculation = MRPCalculation.objects.create(calculation_number='MRP-T-001')
+        calculation.add_log('first', 'second')
+        calculation.add_log('third')
+        self.assertEqual(
+            list(calculation.logs.values_list('seq', 'message')),
+            [(1, 'first'), (2, 'second'), (3, 'third')]
+        )
 
-# Create your tests here.
+    def test_iter_log_reads_text_log_of_older_runs_first(self):
+        calculation = MRPCalculation.objects.create(
+            calculation_number='MRP-T-002', calculation_log='old one\nold two'
+        )
+        calculation.add_log('new')
+        self.assertEqual(list(calculation.iter_log()), ['old one', 'old two', 'new'])
@@ -0,0 +1,144 @@
+"""
+MRP App Utilities
+MRP calculation: explode open work orders into material requirements and
+raise draft purchase requests for the shortfall
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_UP
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from mes.models import WorkOrder
+from .models import BOM, Inventory, Material, MRPCalculation, PurchaseRequest, next_numbers
+
+
+class MRPCalculator:
+    """One MRP run, recorded as an MRPCalculation with its log
+
+    Open work order quantities are exploded through the active BOMs,
+    sub-assemblies level by level, then netted against available stock and
+    purchase requests already past draft. What is still short becomes draft
+    purchase requests; a re-run on the same day updates those drafts in place.
+    """
+    OPEN_WORK_ORDERS = [
+        WorkOrder.Status.PENDING, WorkOrder.Status.READY,
+        WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.PAUSED,
+    ]
+    # Bounds the explosion if a BOM ends up containing its own product
+    MAX_LEVELS = 10
+
+    def __init__(self, run_by=None):
+        self.run_by = run_by
+        # Log lines of the current run, written with one add_log() call at the end
+        self.log = []
+
+    def run_calculation(self):
+        """Run and return (success, calculation); a failed run is kept with the error logged"""
+        now = timezone.now()
+        number, = next_numbers(
+            MRPCalculation.objects, 'calculation_number', f'MRP-{now.strftime("%Y%m%d")}-', 1
+        )
+        calculation = MRPCalculation.objects.create(
+            calculation_number=number, start_time=now, run_by=self.run_by
+        )
+        self.log = []
+        try:
+            with transaction.atomic():
+                self._calculate(calculation)
+        except Exception as exc:
+            # Lines logged before the error were rolled back with the run; keep them
+            calculation.add_log(*self.log, f'Failed: {exc}')
+            calculation.status = MRPCalculation.Status.FAILED
+            calculation.end_time = timezone.now()
+            calculation.save(update_fields=['status', 'end_time'])
+            return False, calculation
+        return True, calculation
+
+    def _calculate(self, calculation):
+        orders = (WorkOrder.objects.filter(status__in=self.OPEN_WORK_ORDERS)
+                  .annotate(remaining=F('planned_quantity') - F('produced_quantity'))
+                  .filter(remaining__gt=0)
+                  .values_list('product', 'remaining'))
+        demand = defaultdict(Decimal)
+        for product_id, remaining in orders:
+            demand[product_id] += remaining
+        calculation.work_orders_analyzed = len(orders)
+        self.log.append(f'{len(orders)} open work orders for {len(demand)} products')
+
+        gross = self._explode(demand)
+        shortfall = self._net(gross)
+
+        today = timezone.now().date()
+        materials = Material.objects.filter(pk__in=list(shortfall)).order_by('material_code')
+        requests = []
+        for material in materials:
+            short = shortfall[material.pk]
+            quantity = max(short, material.min_order_quantity).quantize(Decimal('0.01'), ROUND_UP)
+            requests.append(PurchaseRequest(
+                material=material,
+                requested_quantity=quantity,
+                required_date=today + timedelta(days=material.lead_time_days),
+                requested_by=self.run_by,
+                notes=f'MRP {calculation.calculation_number}',
+            ))
+            self.log.append(
+                f'{material.material_code}: need {gross[material.pk]:.2f}, short {short:.2f}, '
+                f'request {quantity}'
+            )
+        numbers = next_numbers(
+            PurchaseRequest.objects, 'pr_number', f'PR-{today.strftime("%Y%m%d")}-', len(requests)
+        )
+        for number, request in zip(numbers, requests):
+            request.pr_number = number
+
+        calculation.purchase_requests_created = PurchaseRequest.upsert_drafts(requests)
+        calculation.add_log(*self.log)
+        calculation.status = MRPCalculation.Status.COMPLETED
+        calculation.end_time = timezone.now()
+        calculation.save(update_fields=[
+            'work_orders_analyzed', 'purchase_requests_created', 'status', 'end_time'
+        ])
+
+    def _explode(self, demand):
+        """Gross material requirements {material_id: qty} for {product_id: qty}, all levels"""
+        gross = defaultdict(Decimal)
+        for level in range(1, self.MAX_LEVELS + 1):
+            if not demand:
+                break
+            materials, demand = BOM.explode(demand)
+            for material_id, quantity in materials.items():
+                gross[material_id] += quantity
+            self.log.append(
+                f'Level {level}: {len(materials)} materials, {len(demand)} sub-assemblies'
+            )
+        if demand:
+            self.log.append(f'Stopped after {self.MAX_LEVELS} levels; check for recursive BOMs')
+        return gross
+
+    def _net(self, gross):
+        """{material_id: shortfall} after available stock and incoming requests"""
+        # Read from Inventory rather than mv_material_stock, which may still be
+        # waiting for its refresh
+        available = dict(
+            Inventory.objects.filter(material__in=list(gross))
+            .values('material').annotate(total=Sum('quantity_available'))
+            .values_list('material', 'total')
+        )
+        # Drafts are rewritten by this run, so only requests past draft count
+        incoming = dict(
+            PurchaseRequest.objects.filter(material__in=list(gross))
+            .exclude(status__in=[PurchaseRequest.Status.DRAFT, PurchaseRequest.Status.RECEIVED,
+                                 PurchaseRequest.Status.CANCELLED])
+            .values('material').annotate(total=Sum('requested_quantity'))
+            .values_list('material', 'total')
+        )
+        shortfall = {}
+        for material_id, needed in gross.items():
+            short = needed - (available.get(material_id) or 0) - (incoming.get(material_id) or 0)
+            if short > 0:
+                shortfall[material_id] = short
+        return shortfall